@@ -0,0 +1,219 @@
+import functools
+import json
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from booking.metrics import admission_rejections
+
+# Admission control for the expensive endpoints. Every decorated view has a cap on the requests
+# it runs at once and token buckets per client (and per civil ID where the request names one).
+# The counters live in the BOOKING_ADMISSION_CACHE_ALIAS cache, so with a shared backend such as
+# Redis the limits hold across all worker processes. Overflow is rejected before any real work.
+
+
+def admission_cache():
+    """
+    Returns the cache holding the in-flight counters and token buckets.
+    """
+    return caches[settings.BOOKING_ADMISSION_CACHE_ALIAS]
+
+
+def client_key(request):
+    """
+    Returns the identity of the calling client: its IP address.
+    """
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def civil_id_key(request):
+    """
+    Returns the civil ID named in a JSON or form-encoded request body, or None.
+    """
+    # Read the raw body first, so it stays available to the view and the idempotency check
+    body = request.body
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+    else:
+        data = request.POST
+    civil_id = data.get('civil_id')
+    return str(civil_id) if civil_id else None
+
+
+def take_token(key, rate, burst):
+    """
+    Takes one token from the bucket stored under the key, refilling `rate` tokens per second up to `burst`.
+    Returns 0 when a token was taken, otherwise the seconds until the next one is available.
+    Concurrent requests may both read the same state, so a burst can briefly exceed the limit by
+    the number of processes; the long-run rate still holds.
+    """
+    cache = admission_cache()
+    now = time.time()
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+
+    # Keep the bucket just long enough to refill completely; a missing bucket is a full one
+    cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / rate) + 1)
+    return 0
+
+
+def inflight_key(name):
+    """
+    Returns the cache key counting the running requests of an endpoint.
+    """
+    return f'booking:admission:inflight:{name}'
+
+
+def enter(name, limit):
+    """
+    Counts a request into an endpoint and returns whether it is within the concurrency limit.
+    The counter expires after BOOKING_ADMISSION_INFLIGHT_TIMEOUT, so slots leaked by a killed
+    worker are given back eventually.
+    """
+    cache = admission_cache()
+    key = inflight_key(name)
+    cache.add(key, 0, timeout=settings.BOOKING_ADMISSION_INFLIGHT_TIMEOUT)
+    try:
+        inflight = cache.incr(key)
+    except ValueError:
+        # The counter expired between add() and incr()
+        cache.add(key, 1, timeout=settings.BOOKING_ADMISSION_INFLIGHT_TIMEOUT)
+        inflight = 1
+
+    if inflight > limit:
+        leave(name)
+        return False
+    return True
+
+
+def leave(name):
+    """
+    Counts a request out of an endpoint.
+    """
+    cache = admission_cache()
+    key = inflight_key(name)
+    try:
+        if cache.decr(key) < 0:
+            # The counter expired and restarted while requests were running
+            cache.set(key, 0, timeout=settings.BOOKING_ADMISSION_INFLIGHT_TIMEOUT)
+    except ValueError:
+        pass
+
+
+class _LeavingStream:
+    """
+    Wraps the content of a streaming response so its request leaves the endpoint when the
+    stream is exhausted or closed, rather than when the view returns.
+    """
+
+    def __init__(self, content, name):
+        self.content = content
+        self.name = name
+        self.left = False
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.left:
+            self.left = True
+            leave(self.name)
+
+
+def rejected(name, reason, status, retry_after):
+    """
+    Counts a rejection and builds its response.
+    """
+    admission_rejections.labels(name, reason).inc()
+    if status == 429:
+        message = 'Too many requests. Please retry later.'
+    else:
+        message = 'The service is busy. Please retry shortly.'
+    response = JsonResponse({'error': message}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admit(request, name, concurrency_setting, by_civil_id):
+    """
+    Runs the admission checks for one request.
+    Returns (rejection response or None, whether the request was counted into the endpoint
+    and has to leave() when done).
+    """
+    # Token buckets first: they turn away abusive clients without touching the shared counter
+    buckets = [('client', client_key(request), settings.BOOKING_RATE_PER_CLIENT, settings.BOOKING_RATE_BURST_PER_CLIENT)]
+    if by_civil_id:
+        buckets.append((
+            'civil_id', civil_id_key(request), settings.BOOKING_RATE_PER_CIVIL_ID, settings.BOOKING_RATE_BURST_PER_CIVIL_ID
+        ))
+    for scope, identity, rate, burst in buckets:
+        if not rate or identity is None:
+            continue
+        wait = take_token(f'booking:admission:rate:{name}:{scope}:{identity}', rate, burst)
+        if wait:
+            return rejected(name, f'rate_{scope}', 429, wait), False
+
+    limit = getattr(settings, concurrency_setting)
+    if not limit:
+        return None, False
+    if not enter(name, limit):
+        return rejected(name, 'concurrency', 503, 1), False
+    return None, True
+
+
+def admission_control(name, concurrency_setting, by_civil_id=False):
+    """
+    Limits a view to the number of concurrent requests in the given setting (0 for no limit)
+    and to the per-client token bucket, plus the per-civil-ID bucket when by_civil_id is set.
+    Requests over a rate limit get a 429, requests over the concurrency limit a 503, both with
+    Retry-After. Works on sync and async views; a sync streaming response holds its place
+    until the stream is finished.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response, entered = await sync_to_async(admit)(request, name, concurrency_setting, by_civil_id)
+                if response is not None:
+                    return response
+                try:
+                    return await view(request, *args, **kwargs)
+                finally:
+                    if entered:
+                        await sync_to_async(leave)(name)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response, entered = admit(request, name, concurrency_setting, by_civil_id)
+            if response is not None:
+                return response
+            try:
+                response = view(request, *args, **kwargs)
+                if entered and response.streaming and not response.is_async:
+                    # The work happens while the content is sent; leave once it has been
+                    response.streaming_content = _LeavingStream(response.streaming_content, name)
+                    entered = False
+                return response
+            finally:
+                if entered:
+                    leave(name)
+
+        return wrapper
+
+    return decorator
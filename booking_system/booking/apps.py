@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
+
+    def ready(self):
+        # Register signal handlers that keep derived booking data in sync
+        from booking import signals  # noqa: F401
+
+        # Count the queries of every request on all database connections
+        from django.db.backends.signals import connection_created
+        from booking.metrics import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='booking_query_recorder')
@@ -0,0 +1,135 @@
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from booking.conditional import bookings_changed
+from booking.models import ArchivedBooking, Booking, QrJob, SlotOccupancy
+
+# Columns copied from a booking into the archive
+ARCHIVED_FIELDS = ('id', 'name', 'civil_id', 'resource_id', 'start_time', 'qr_code', 'qr_status', 'created_at', 'updated_at')
+
+
+def archive_horizon():
+    """
+    Returns the start time before which bookings belong in the archive.
+    """
+    return timezone.now() - timedelta(days=settings.BOOKING_ARCHIVE_AFTER_DAYS)
+
+
+def reaches_archive(range_start=None):
+    """
+    Returns whether a read starting at range_start (None for the very beginning) may find archived bookings.
+    Only bookings behind the horizon are ever archived, so later ranges never need the archive.
+    """
+    return range_start is None or range_start < archive_horizon()
+
+
+def booking_sources(range_start=None):
+    """
+    Returns the querysets a read starting at range_start has to cover: the hot table,
+    plus the archive when the range reaches into it.
+    """
+    if reaches_archive(range_start):
+        return [Booking.objects.all(), ArchivedBooking.objects.all()]
+    return [Booking.objects.all()]
+
+
+def merge_by_start_time(*iterables):
+    """
+    Merges rows or instances that are each ordered by (start_time, id) into one ordered stream.
+    """
+    return heapq.merge(*iterables, key=lambda booking: (booking.start_time, booking.id))
+
+
+async def amerge_by_start_time(*iterables):
+    """
+    Async version of merge_by_start_time for async iterables.
+    """
+    heads = []
+    for index, iterable in enumerate(iterables):
+        iterator = aiter(iterable)
+        booking = await anext(iterator, None)
+        if booking is not None:
+            heads.append(((booking.start_time, booking.id), index, booking, iterator))
+    heapq.heapify(heads)
+
+    while heads:
+        _, index, booking, iterator = heads[0]
+        yield booking
+        following = await anext(iterator, None)
+        if following is None:
+            heapq.heappop(heads)
+        else:
+            heapq.heapreplace(heads, ((following.start_time, following.id), index, following, iterator))
+
+
+def get_booking(booking_id):
+    """
+    Returns a booking from the hot table or the archive.
+    Raises Booking.DoesNotExist when it is in neither.
+    """
+    try:
+        return Booking.objects.get(id=booking_id)
+    except Booking.DoesNotExist:
+        try:
+            return ArchivedBooking.objects.get(id=booking_id)
+        except ArchivedBooking.DoesNotExist:
+            raise Booking.DoesNotExist(f'Booking {booking_id} does not exist.') from None
+
+
+async def aget_booking(booking_id):
+    """
+    Async version of get_booking.
+    """
+    try:
+        return await Booking.objects.aget(id=booking_id)
+    except Booking.DoesNotExist:
+        try:
+            return await ArchivedBooking.objects.aget(id=booking_id)
+        except ArchivedBooking.DoesNotExist:
+            raise Booking.DoesNotExist(f'Booking {booking_id} does not exist.') from None
+
+
+def archive_bookings(before=None, batch_size=1000):
+    """
+    Moves bookings starting before the given time (the archive horizon by default, never later)
+    into the archive and returns how many were moved.
+    Every batch is copied and deleted in its own short transaction, so writers are never
+    blocked for long, and an interrupted run leaves each booking in exactly one table.
+    """
+    # Reads only look into the archive behind the horizon, so nothing later may be moved there
+    before = min(before or archive_horizon(), archive_horizon())
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.objects.filter(start_time__lt=before).order_by('start_time', 'id')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+
+            booking_ids = [row['id'] for row in rows]
+            ArchivedBooking.objects.bulk_create([ArchivedBooking(**row) for row in rows])
+            QrJob.objects.filter(booking_id__in=booking_ids).delete()
+            # A raw delete skips the delete signals: the bookings still occupy their past slots
+            # and keep their cached tickets, they only live in another table now. Nothing cascades
+            # either, as QR jobs, the only rows referencing bookings, were deleted above
+            Booking.objects.filter(id__in=booking_ids)._raw_delete(Booking.objects.db)
+            # Past slots take no more bookings, so the counters of the slots emptied by this batch can go
+            # as well. Bookings sharing the last start time may be left for the next batch, and keep theirs
+            slots = {}
+            for row in rows:
+                slots.setdefault(row['resource_id'], set()).add(row['start_time'])
+            for resource_id, start_times in slots.items():
+                SlotOccupancy.objects.filter(resource_id=resource_id, start_time__in=start_times).exclude(
+                    Exists(Booking.objects.filter(resource_id=OuterRef('resource_id'), start_time=OuterRef('start_time')))
+                ).delete()
+            bookings_changed(booking_ids)
+        moved += len(rows)
+    return moved
+
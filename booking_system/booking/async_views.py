@@ -0,0 +1,232 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from booking.admission import admission_control
+from booking.archive import aget_booking, amerge_by_start_time
+from booking.conditional import booking_last_modified, list_etag, make_etag, not_modified, set_validators
+from booking.events import broadcaster, encode_event
+from booking.idempotency import idempotent
+from booking.models import Booking
+from booking.pagination import amerged_keyset_page, parse_limit
+from booking.replicas import reads_from_replica
+from booking.reservations import SlotTakenError, reserve_booking
+from booking.serializers import (
+    BookingSerializer, booking_representer, booking_row, encode_json, represent_bookings
+)
+from booking.tickets import get_ticket_pdf
+from booking.views import STREAM_CONTENT_TYPES, STREAM_ROWS_PER_CHUNK, encode_stream_chunk, list_querysets
+
+# Async counterparts of the booking views for ASGI deployments. Database access goes through
+# Django's async ORM, transactions run in a worker thread, and CPU-bound rendering runs on a
+# bounded executor, so one event loop can serve many slow clients without a thread per request.
+
+_cpu_executor = None
+_cpu_executor_lock = threading.Lock()
+
+
+def cpu_executor():
+    """
+    Returns the bounded executor that runs CPU-bound rendering off the event loop.
+    """
+    global _cpu_executor
+    with _cpu_executor_lock:
+        if _cpu_executor is None:
+            _cpu_executor = ThreadPoolExecutor(
+                max_workers=settings.BOOKING_ASYNC_CPU_WORKERS, thread_name_prefix='booking-cpu'
+            )
+        return _cpu_executor
+
+
+def request_data(request):
+    """
+    Returns the submitted fields of a JSON or form-encoded request body.
+    """
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+@admission_control('create_booking', 'BOOKING_CREATE_MAX_CONCURRENCY', by_civil_id=True)
+@idempotent
+async def create_booking(request):
+    """
+    Handles POST requests to create a new booking.
+    Same contract as the synchronous create endpoint.
+    """
+    try:
+        data = request_data(request)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+
+    serializer = BookingSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        # Return validation errors if any
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        # Transactions are not available to async code, so the reservation runs in a worker thread
+        booking = await sync_to_async(reserve_booking)(serializer)
+    except SlotTakenError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    response_data = {
+        'message': 'Booking created successfully',
+        'booking': booking_representer()(booking_row(booking))
+    }
+    return HttpResponse(encode_json(response_data), content_type='application/json', status=200)
+
+
+@require_GET
+@reads_from_replica
+async def get_all_bookings(request):
+    """
+    Handles GET requests to retrieve bookings.
+    Same contract as the synchronous list endpoint; streamed lists are produced by an async generator.
+    """
+    stream_format = request.GET.get('stream')
+    if stream_format:
+        if stream_format not in STREAM_CONTENT_TYPES:
+            return JsonResponse({'error': 'stream must be one of: json, ndjson.'}, status=400)
+    else:
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+
+    try:
+        querysets = list_querysets(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    etag = await sync_to_async(list_etag)(request)
+    unchanged = not_modified(request, etag, None)
+    if unchanged is not None:
+        return unchanged
+
+    if stream_format:
+        response = StreamingHttpResponse(
+            stream_bookings(querysets, stream_format), content_type=STREAM_CONTENT_TYPES[stream_format]
+        )
+        return set_validators(response, etag, None)
+
+    bookings, next_cursor = await amerged_keyset_page(querysets, request.GET.get('cursor'), limit)
+
+    response_data = {"bookings": represent_bookings(bookings), "next_cursor": next_cursor}
+    response = HttpResponse(encode_json(response_data), content_type='application/json', status=200)
+    return set_validators(response, etag, None)
+
+
+async def stream_bookings(querysets, stream_format):
+    """
+    Async generator yielding every booking in chunks, fetched with async iteration.
+    """
+    represent = booking_representer()
+    bookings = amerge_by_start_time(*(
+        queryset.order_by('start_time', 'id').aiterator(chunk_size=settings.BOOKING_STREAM_CHUNK_SIZE)
+        for queryset in querysets
+    ))
+    if stream_format == 'json':
+        yield b'{"bookings": ['
+
+    separator = b''
+    chunk = []
+    async for booking in bookings:
+        chunk.append(encode_json(represent(booking)))
+        if len(chunk) == STREAM_ROWS_PER_CHUNK:
+            yield encode_stream_chunk(chunk, stream_format, separator)
+            separator = b', '
+            chunk = []
+    if chunk:
+        yield encode_stream_chunk(chunk, stream_format, separator)
+
+    if stream_format == 'json':
+        yield b']}'
+
+
+@require_GET
+@admission_control('generate_booking_pdf', 'BOOKING_PDF_MAX_CONCURRENCY')
+@reads_from_replica
+async def generate_booking_pdf(request):
+    """
+    Handles GET requests to generate a PDF ticket for a specific booking.
+    Same contract as the synchronous PDF endpoint; rendering runs on the CPU executor.
+    """
+    booking_id = request.GET.get('booking_id')
+
+    if not booking_id:
+        return JsonResponse({'error': 'Booking ID is required.'}, status=400)
+
+    try:
+        last_modified = await sync_to_async(booking_last_modified)(int(booking_id))
+    except ValueError:
+        last_modified = None
+    if last_modified is None:
+        return JsonResponse({'error': 'Booking not found.'}, status=404)
+
+    unchanged = not_modified(request, make_etag('ticket', booking_id, last_modified.isoformat()), last_modified)
+    if unchanged is not None:
+        return unchanged
+
+    try:
+        booking = await aget_booking(booking_id)
+    except Booking.DoesNotExist:
+        return JsonResponse({'error': 'Booking not found.'}, status=404)
+
+    loop = asyncio.get_running_loop()
+    pdf, cache_hit = await loop.run_in_executor(cpu_executor(), get_ticket_pdf, booking)
+
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="Booking_{booking_id}.pdf"'
+    response['X-Ticket-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return set_validators(response, make_etag('ticket', booking_id, booking.updated_at.isoformat()), booking.updated_at)
+
+
+@require_GET
+async def slot_events(request):
+    """
+    Streams slot_taken and slot_freed events as Server-Sent Events, optionally for one resource
+    (?resource=). A reconnecting client sends the ID of the last event it saw (the Last-Event-ID
+    header, or ?last_event_id= on a fresh page) and gets the events it missed; when they are no
+    longer kept it gets a reset event and should reload the list. Idle streams carry keep-alive comments.
+    Only served under ASGI: a WSGI server would drain the endless stream before sending a byte.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The event stream is only available on the ASGI application.'}, status=501)
+
+    resource_id = request.GET.get('resource')
+    if resource_id is not None:
+        try:
+            resource_id = int(resource_id)
+        except ValueError:
+            return JsonResponse({'error': 'resource must be an integer.'}, status=400)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    events = broadcaster().subscribe(last_event_id, idle_timeout=settings.BOOKING_EVENTS_KEEPALIVE)
+
+    async def stream():
+        try:
+            async for event in events:
+                if event is None:
+                    yield b': keep-alive\n\n'
+                elif resource_id is None or event.resource_id in (None, resource_id):
+                    yield encode_event(event)
+        finally:
+            # Unsubscribe as soon as the client is gone
+            await events.aclose()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep proxies such as nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
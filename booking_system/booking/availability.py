@@ -0,0 +1,187 @@
+import itertools
+import random
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from booking.archive import booking_sources
+from booking.models import SlotOccupancy
+from booking.slots import day_range, slot_duration
+
+
+def slots_per_day():
+    """
+    Returns the number of bookable slots between the daily window opening and closing times.
+    """
+    window_minutes = (settings.BOOKING_ENDING_WINDOW_TIME - settings.BOOKING_STARTING_WINDOW_TIME) * 60
+    return window_minutes // settings.BOOKING_DURATION
+
+
+def day_slot_starts(day):
+    """
+    Returns the start times of every slot on the given day.
+    """
+    window_start = datetime.combine(day, time(settings.BOOKING_STARTING_WINDOW_TIME), tzinfo=timezone.utc)
+    return [window_start + index * slot_duration() for index in range(slots_per_day())]
+
+
+def slot_index(start_time):
+    """
+    Returns the position of a start time within its day's slots, or None if it is outside the window.
+    """
+    start_time = start_time.astimezone(timezone.utc)
+    minutes_into_window = (start_time.hour - settings.BOOKING_STARTING_WINDOW_TIME) * 60 + start_time.minute
+    index = minutes_into_window // settings.BOOKING_DURATION
+    if minutes_into_window < 0 or index >= slots_per_day():
+        return None
+    return index
+
+
+def occupancy_version_key(resource_id, day):
+    """
+    Returns the cache key holding the version of a resource's day calendar.
+    """
+    return f'booking:availability:version:{resource_id}:{day.isoformat()}'
+
+
+def occupancy_cache_key(resource_id, day, version):
+    """
+    Returns the cache key holding the occupancy bitmap of a resource's day at the given version.
+    """
+    return f'booking:availability:{resource_id}:{day.isoformat()}:{version}'
+
+
+def occupancy_versions(resource_id, days):
+    """
+    Returns the current version of each day's calendar, starting the missing ones at a random
+    number so a version evicted from the cache is never reused.
+    """
+    keys = {day: occupancy_version_key(resource_id, day) for day in days}
+    versions = cache.get_many(list(keys.values()))
+    for day, key in keys.items():
+        if key not in versions:
+            cache.add(key, random.getrandbits(48), timeout=None)
+            versions[key] = cache.get(key)
+    return {day: versions[key] for day, key in keys.items()}
+
+
+def next_occupancy_version(resource_id, day):
+    """
+    Atomically moves a day's calendar to a new version and returns the previous and the new one.
+    Bitmaps still being computed for the previous version are filed under it and never read again.
+    """
+    key = occupancy_version_key(resource_id, day)
+    cache.add(key, random.getrandbits(48), timeout=None)
+    version = cache.incr(key)
+    return version - 1, version
+
+
+def get_occupancy(first_day, last_day, resource):
+    """
+    Returns a {day: bitmap} mapping for every day in the inclusive range of a resource.
+    Bit N of a bitmap is set when slot N of that day is full. Cached days are served
+    from the cache; all missing days are filled with a single indexed range read.
+    Bitmaps are filed under the day versions read before the database, so a read that
+    races with a booking change can never overwrite the calendar the change left behind.
+    """
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    versions = occupancy_versions(resource.pk, days)
+    keys = {day: occupancy_cache_key(resource.pk, day, versions[day]) for day in days}
+    cached = cache.get_many(list(keys.values()))
+    occupancy = {day: cached[key] for day, key in keys.items() if key in cached}
+
+    missing_days = [day for day in days if day not in occupancy]
+    if missing_days:
+        # Read every booking of the missing days with one query on the (resource, start_time) index,
+        # plus one on the archive when the days reach into it
+        range_start, range_end = day_range(missing_days[0], missing_days[-1])
+        booked = Counter(itertools.chain.from_iterable(
+            queryset.filter(
+                resource=resource, start_time__gte=range_start, start_time__lt=range_end
+            ).values_list('start_time', flat=True)
+            for queryset in booking_sources(range_start)
+        ))
+
+        computed = {day: 0 for day in missing_days}
+        for start_time, count in booked.items():
+            day = start_time.astimezone(timezone.utc).date()
+            index = slot_index(start_time)
+            if day in computed and index is not None and count >= resource.capacity:
+                computed[day] |= 1 << index
+
+        cache.set_many(
+            {keys[day]: bitmap for day, bitmap in computed.items()},
+            timeout=settings.BOOKING_AVAILABILITY_CACHE_TIMEOUT,
+        )
+        occupancy.update(computed)
+
+    return occupancy
+
+
+def update_occupancy(resource_id, start_time, taken):
+    """
+    Incrementally sets or clears the bit of one slot, moving its day's calendar to a new version.
+    The new bitmap is derived from the previous version's; when that is not cached (or another
+    change is in between), the day is left to be rebuilt from the database on the next read.
+    """
+    day = start_time.astimezone(timezone.utc).date()
+    previous, version = next_occupancy_version(resource_id, day)
+    index = slot_index(start_time)
+    if index is None:
+        return
+
+    bitmap = cache.get(occupancy_cache_key(resource_id, day, previous))
+    if bitmap is None:
+        return
+
+    bitmap = bitmap | (1 << index) if taken else bitmap & ~(1 << index)
+    cache.set(
+        occupancy_cache_key(resource_id, day, version), bitmap, timeout=settings.BOOKING_AVAILABILITY_CACHE_TIMEOUT
+    )
+
+
+def refresh_occupancy(resource_id, start_time):
+    """
+    Updates the bit of one slot after a booking was added: the slot is full once its counter
+    reaches the capacity. The counter is only read when the day is cached.
+    """
+    day = start_time.astimezone(timezone.utc).date()
+    version = occupancy_versions(resource_id, [day])[day]
+    if cache.get(occupancy_cache_key(resource_id, day, version)) is None:
+        # Nothing to update, but a read in flight must still not file its calendar
+        next_occupancy_version(resource_id, day)
+        return
+
+    counter = SlotOccupancy.objects.filter(resource_id=resource_id, start_time=start_time).values_list(
+        'booked', 'resource__capacity'
+    ).first()
+    update_occupancy(resource_id, start_time, taken=counter is not None and counter[0] >= counter[1])
+
+
+def invalidate_occupancy(resource_id, start_time):
+    """
+    Drops the cached calendar of the resource's day containing the start time,
+    by moving the day to a new version.
+    """
+    next_occupancy_version(resource_id, start_time.astimezone(timezone.utc).date())
+
+
+def build_availability(first_day, last_day, resource):
+    """
+    Returns the free and full slots of a resource for every day in the inclusive range.
+    """
+    occupancy = get_occupancy(first_day, last_day, resource)
+    days = []
+    for day, bitmap in sorted(occupancy.items()):
+        slots = [
+            {
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M'),
+                'end_time': (start_time + slot_duration()).strftime('%Y-%m-%d %H:%M'),
+                'available': not bitmap & (1 << index),
+            }
+            for index, start_time in enumerate(day_slot_starts(day))
+        ]
+        days.append({'date': day.isoformat(), 'slots': slots})
+    return days
@@ -0,0 +1,161 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from booking.models import ArchivedBooking, Booking
+from booking.replicas import read_alias
+
+# Validators for conditional GETs. They are derived from updated_at and kept in the cache, so
+# a client polling an unchanged resource gets a 304 without a serializer or ReportLab run.
+
+LIST_GENERATION_KEY = 'booking:list:generation'
+
+
+def validator_source():
+    """
+    Returns the database the validators of the current request are read from and how long
+    they are cached. Validators read from a replica are filed apart and kept for only
+    BOOKING_REPLICA_MAX_LAG seconds, so a read made while the replica trailed a write is not served for long.
+    """
+    alias = read_alias.get()
+    if alias is None:
+        return DEFAULT_DB_ALIAS, settings.BOOKING_VALIDATOR_CACHE_TIMEOUT
+    return alias, min(settings.BOOKING_VALIDATOR_CACHE_TIMEOUT, settings.BOOKING_REPLICA_MAX_LAG)
+
+
+def booking_validator_key(booking_id, alias=DEFAULT_DB_ALIAS):
+    """
+    Returns the cache key holding the last modification time of a booking as read from a database.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return f'booking:validator:{booking_id}'
+    return f'booking:validator:{alias}:{booking_id}'
+
+
+def make_etag(*parts):
+    """
+    Builds a quoted strong ETag from the parts identifying one representation.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def list_validator():
+    """
+    Returns (generation, last_modified, count) of the bookings table, served from the cache.
+    The cached value is filed under a generation that every change replaces, so a
+    computation racing with a write can never outlive the write.
+    """
+    generation = cache.get(LIST_GENERATION_KEY)
+    if generation is None:
+        cache.add(LIST_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(LIST_GENERATION_KEY)
+
+    alias, timeout = validator_source()
+    key = f'booking:list:validator:{generation}'
+    if alias != DEFAULT_DB_ALIAS:
+        key = f'{key}:{alias}'
+    validator = cache.get(key)
+    if validator is None:
+        # One aggregate per table; updated_at moves on every change except deletes, which the count catches.
+        # Archiving moves rows without changing either total; the new generation still changes the ETag.
+        hot = Booking.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        archived = ArchivedBooking.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        modified = [totals['last_modified'] for totals in (hot, archived) if totals['last_modified']]
+        validator = (max(modified, default=None), hot['count'] + archived['count'])
+        cache.set(key, validator, timeout)
+    return (generation, *validator)
+
+
+def invalidate_list_validator():
+    """
+    Starts a new generation of the list validator after bookings were created, changed or deleted.
+    """
+    cache.set(LIST_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def booking_last_modified(booking_id):
+    """
+    Returns the updated_at of a booking, served from the cache, or None if it does not exist.
+    Archived bookings are looked up when the booking is not in the hot table.
+    """
+    alias, timeout = validator_source()
+    key = booking_validator_key(booking_id, alias)
+    last_modified = cache.get(key)
+    if last_modified is None:
+        last_modified = Booking.objects.filter(id=booking_id).values_list('updated_at', flat=True).first()
+        if last_modified is None:
+            last_modified = ArchivedBooking.objects.filter(id=booking_id).values_list('updated_at', flat=True).first()
+        if last_modified is not None:
+            cache.set(key, last_modified, timeout)
+    return last_modified
+
+
+def invalidate_booking_validators(booking_ids):
+    """
+    Drops the cached modification times of the given bookings, as read from every database.
+    """
+    cache.delete_many([
+        booking_validator_key(booking_id, alias)
+        for booking_id in booking_ids
+        for alias in [DEFAULT_DB_ALIAS, *settings.BOOKING_READ_REPLICAS]
+    ])
+
+
+def bookings_changed(booking_ids):
+    """
+    Drops the validators of changed bookings and of the list once the current transaction commits.
+    For writes that bypass the model signals, such as bulk inserts and queryset updates.
+    """
+    booking_ids = list(booking_ids)
+
+    def invalidate():
+        invalidate_list_validator()
+        invalidate_booking_validators(booking_ids)
+
+    transaction.on_commit(invalidate)
+
+
+def list_etag(request):
+    """
+    Returns the ETag of the bookings list as requested.
+    The ETag covers the validator generation, so every write that invalidates it changes the ETag,
+    also when the totals come out the same. The query string is part of the ETag as well, so every
+    page and stream format has its own.
+    Lists carry no Last-Modified: deleting or archiving a booking leaves the latest updated_at
+    in place, so If-Modified-Since alone would keep confirming a stale list.
+    """
+    generation, last_modified, count = list_validator()
+    return make_etag(
+        'list', generation, last_modified.isoformat() if last_modified else '', count, request.META.get('QUERY_STRING', '')
+    )
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Returns a 304 response carrying the validators when the client's If-None-Match /
+    If-Modified-Since still match, otherwise None.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Adds the validators to a response and asks clients to revalidate before reusing it.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Live slot updates for the frontend. Every committed change to the bookings of a slot publishes a
+# compact slot_taken / slot_freed event to the broadcaster, which fans it out to the open event
+# streams (`bookings/async/events/`), so clients stop re-polling the list to learn about taken slots.
+# Events carry an ID and the recent ones are kept, so a reconnecting client resumes where it left off.
+
+
+class SlotEvent(NamedTuple):
+    """
+    One published event: its ID, type and JSON-encoded data, plus the resource it concerns.
+    """
+    id: str
+    type: str
+    data: bytes
+    resource_id: int
+
+
+class LocalBroadcaster:
+    """
+    Fans events out to the subscribers of this process.
+    Each subscriber has a bounded queue on its event loop; events are published from any thread.
+    The last BOOKING_EVENTS_HISTORY events are kept for resuming. Event IDs are prefixed with an
+    epoch that changes when the process restarts, so stale IDs are recognized rather than misread.
+    Only writes made in this process are seen: deployments spreading writes over several processes
+    need a broadcaster backed by a shared channel with the same publish/subscribe interface.
+    """
+
+    # Type of the first event of a new subscription, carrying the ID to resume from
+    READY = 'ready'
+
+    # Type of the event telling a client that events were missed and it has to reload the list
+    RESET = 'reset'
+
+    def __init__(self, history=None, queue_size=None):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.history = deque(maxlen=history or settings.BOOKING_EVENTS_HISTORY)
+        self.queue_size = queue_size or settings.BOOKING_EVENTS_QUEUE_SIZE
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def last_event_id(self):
+        """
+        Returns the ID of the latest event, or of the start of this process when there is none.
+        """
+        return f'{self.epoch}-{self.sequence}'
+
+    def publish(self, event_type, data, resource_id):
+        """
+        Publishes an event to every subscriber and returns it.
+        """
+        with self.lock:
+            self.sequence += 1
+            event = SlotEvent(self.last_event_id(), event_type, json.dumps(data).encode(), resource_id)
+            self.history.append((self.sequence, event))
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        return event
+
+    def missed_events(self, last_event_id):
+        """
+        Returns the kept events published after the given ID, or None when the client may have
+        missed events that are no longer kept (or the ID is from another process).
+        Must be called holding the lock.
+        """
+        epoch, _, sequence = (last_event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit() or int(sequence) > self.sequence:
+            return None
+        sequence = int(sequence)
+        oldest = self.history[0][0] if self.history else self.sequence + 1
+        if sequence < oldest - 1:
+            return None
+        return [event for event_sequence, event in self.history if event_sequence > sequence]
+
+    async def subscribe(self, last_event_id=None, idle_timeout=None):
+        """
+        Yields the events published from now on, after those missed since last_event_id when given;
+        a new subscription starts with a ready event. When the missed events cannot be replayed, or
+        the subscriber falls too far behind, a reset event is yielded instead and the subscription
+        ends; the client reloads and reconnects. Yields None after idle_timeout seconds without events.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            # Registering and reading the history under one lock leaves no gap and no duplicate
+            self.subscribers.add(subscriber)
+            missed = [] if last_event_id is None else self.missed_events(last_event_id)
+            current_id = self.last_event_id()
+
+        try:
+            if missed is None:
+                yield SlotEvent(current_id, self.RESET, b'{}', None)
+                return
+            if last_event_id is None:
+                yield SlotEvent(current_id, self.READY, b'{}', None)
+            for event in missed:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), idle_timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    # The queue overflowed; the events in it were dropped
+                    with self.lock:
+                        current_id = self.last_event_id()
+                    yield SlotEvent(current_id, self.RESET, b'{}', None)
+                    return
+                yield event
+        finally:
+            with self.lock:
+                self.subscribers.discard(subscriber)
+
+
+class _Subscriber:
+    """
+    The queue of one subscription, fed from any thread through its event loop.
+    """
+
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        # One extra place for the overflow marker
+        self.queue = asyncio.Queue(maxsize=queue_size + 1)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed; the subscription is about to be discarded
+            pass
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.queue.maxsize - 1:
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def broadcaster():
+    """
+    Returns the broadcaster of this process, an instance of BOOKING_EVENTS_BROADCASTER.
+    """
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = import_string(settings.BOOKING_EVENTS_BROADCASTER)()
+        return _broadcaster
+
+
+def set_broadcaster(instance):
+    """
+    Replaces the broadcaster of this process (e.g. with a stand-in in tests) and returns the previous one.
+    """
+    global _broadcaster
+    with _broadcaster_lock:
+        previous, _broadcaster = _broadcaster, instance
+        return previous
+
+
+def slot_data(resource_id, start_time):
+    """
+    Returns the data of a slot event.
+    """
+    start_time = timezone.localtime(start_time).isoformat()
+    if start_time.endswith('+00:00'):
+        start_time = start_time[:-6] + 'Z'
+    return {'resource': resource_id, 'start_time': start_time}
+
+
+def slots_changed(taken=(), freed=()):
+    """
+    Publishes slot_taken events for the taken and slot_freed events for the freed
+    (resource_id, start_time) pairs once the current transaction commits.
+    """
+    events = [('slot_freed', slot) for slot in freed] + [('slot_taken', slot) for slot in taken]
+    if not events:
+        return
+
+    def publish():
+        events_broadcaster = broadcaster()
+        for event_type, (resource_id, start_time) in events:
+            events_broadcaster.publish(event_type, slot_data(resource_id, start_time), resource_id)
+
+    transaction.on_commit(publish)
+
+
+def encode_event(event):
+    """
+    Encodes an event in the Server-Sent Events format.
+    """
+    return b'id: %s\nevent: %s\ndata: %s\n\n' % (event.id.encode(), event.type.encode(), event.data)
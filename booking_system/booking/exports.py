@@ -0,0 +1,137 @@
+import csv
+import heapq
+import io
+import zlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from booking.archive import booking_sources
+from booking.serializers import encode_json
+
+# Columns of an export, in CSV column order
+EXPORT_FIELDS = ('id', 'name', 'civil_id', 'resource_id', 'start_time', 'qr_status', 'created_at', 'updated_at')
+
+# Content types of the export formats
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Filters accepted by an export: parameter -> queryset lookup
+EXPORT_FILTERS = {
+    'start_from': 'start_time__gte',
+    'start_before': 'start_time__lt',
+    'created_from': 'created_at__gte',
+    'created_before': 'created_at__lt',
+    'since': 'updated_at__gte',
+}
+
+
+def parse_bound(name, value):
+    """
+    Parses an ISO 8601 date or date-time given for the named filter into an aware datetime.
+    A bare date stands for its midnight in the current time zone.
+    Raises ValueError with a client-facing message when the value is invalid.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time()) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError(f'Invalid {name}. Use YYYY-MM-DD or an ISO 8601 date-time.')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_filters(params):
+    """
+    Returns the queryset filters for the export parameters (see EXPORT_FILTERS).
+    Raises ValueError with a client-facing message for invalid values.
+    """
+    return {
+        lookup: parse_bound(name, params[name])
+        for name, lookup in EXPORT_FILTERS.items()
+        if params.get(name)
+    }
+
+
+def export_rows(filters):
+    """
+    Returns an iterator over the exported bookings as tuples of EXPORT_FIELDS, current and archived alike.
+    Incremental exports (since) come in (updated_at, id) order, so the last row's updated_at
+    is the next run's since; full exports come in ID order. Every table is read through
+    a server-side cursor where the database has them, so memory stays flat for any size.
+    """
+    ordering = ('updated_at', 'id') if 'updated_at__gte' in filters else ('id',)
+    positions = [EXPORT_FIELDS.index(field) for field in ordering]
+    streams = [
+        queryset.filter(**filters).order_by(*ordering).values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=settings.BOOKING_EXPORT_CHUNK_SIZE)
+        for queryset in booking_sources(filters.get('start_time__gte'))
+    ]
+    return heapq.merge(*streams, key=lambda row: tuple(row[position] for position in positions))
+
+
+def export_values(row):
+    """
+    Returns the values of an exported row with dates in ISO 8601.
+    """
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def encode_ndjson(rows):
+    """
+    Yields chunks of newline-delimited JSON, one object per booking.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(encode_json(dict(zip(EXPORT_FIELDS, export_values(row)))) + b'\n')
+        if len(chunk) == settings.BOOKING_EXPORT_CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+    if chunk:
+        yield b''.join(chunk)
+
+
+def encode_csv(rows):
+    """
+    Yields chunks of CSV with a header line, dates in ISO 8601.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(export_values(row))
+        if count % settings.BOOKING_EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses a stream of byte chunks into a gzip stream on the fly.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(filters, export_format, compress=False):
+    """
+    Returns an iterator over the encoded export of the bookings matching the filters, gzip-compressed if asked.
+    """
+    encode = encode_csv if export_format == 'csv' else encode_ndjson
+    chunks = encode(export_rows(filters))
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,222 @@
+import asyncio
+import functools
+import hashlib
+import math
+import time
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from booking.metrics import idempotent_requests
+from booking.models import IdempotencyKey
+
+# Header marking a response that was replayed from the idempotency store
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Seconds between two looks at a key another request is still working on
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    """
+    Returns a hash of the method, path and body of a request, so a key reused for a
+    different request is told apart from a retry.
+    """
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def claim_key(key, fingerprint):
+    """
+    Tries to become the one request executing under the key.
+    Returns None when the key was claimed, otherwise the existing row.
+    """
+    now = timezone.now()
+    # Expired keys are forgotten, so the key can be used again
+    IdempotencyKey.objects.filter(key=key, created_at__lt=now - timedelta(seconds=settings.BOOKING_IDEMPOTENCY_TTL)).delete()
+    try:
+        # The savepoint keeps a failed insert from breaking an enclosing transaction
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, fingerprint=fingerprint, created_at=now)
+        return None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(key=key).first()
+    if record is None:
+        # The holder gave up the key between our insert and this read; try again
+        return claim_key(key, fingerprint)
+
+    abandoned = now - timedelta(seconds=settings.BOOKING_IDEMPOTENCY_LOCK_TIMEOUT)
+    if record.status_code is None and record.fingerprint == fingerprint and record.created_at < abandoned:
+        # The request holding the key died without finishing; take its claim over, unless someone else just did
+        taken_over = IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, created_at=record.created_at
+        ).update(created_at=now)
+        if taken_over:
+            return None
+    return record
+
+
+# Result of an attempt at claiming a key that another request still holds
+WAIT = object()
+
+
+def try_acquire(key, fingerprint, give_up):
+    """
+    Makes one attempt at claiming the key.
+    Returns None when the caller should execute the request, the response to send, or WAIT
+    when the request holding the key is still running; once give_up is set that is a 409 instead.
+    """
+    record = claim_key(key, fingerprint)
+    if record is None:
+        idempotent_requests.labels('executed').inc()
+        return None
+
+    if record.fingerprint != fingerprint:
+        idempotent_requests.labels('mismatch').inc()
+        return JsonResponse(
+            {'error': 'This Idempotency-Key was already used for a different request.'}, status=422
+        )
+
+    if record.status_code is not None:
+        idempotent_requests.labels('replayed').inc()
+        response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+        response[REPLAYED_HEADER] = 'true'
+        return response
+
+    if not give_up:
+        return WAIT
+    idempotent_requests.labels('conflict').inc()
+    response = JsonResponse(
+        {'error': 'A request with this Idempotency-Key is still being processed.'}, status=409
+    )
+    response['Retry-After'] = str(max(1, math.ceil(settings.BOOKING_IDEMPOTENCY_WAIT)))
+    return response
+
+
+def acquire(key, fingerprint):
+    """
+    Claims the key or waits for the request already holding it.
+    Returns None when the caller should execute the request, otherwise the response to send.
+    """
+    deadline = time.monotonic() + settings.BOOKING_IDEMPOTENCY_WAIT
+    while True:
+        response = try_acquire(key, fingerprint, time.monotonic() >= deadline)
+        if response is not WAIT:
+            return response
+        time.sleep(POLL_INTERVAL)
+
+
+async def aacquire(key, fingerprint):
+    """
+    Async counterpart of acquire. Only the single attempts run in the sync thread; the waiting
+    happens on the event loop, so the request holding the key can finish meanwhile.
+    """
+    deadline = time.monotonic() + settings.BOOKING_IDEMPOTENCY_WAIT
+    while True:
+        response = await sync_to_async(try_acquire)(key, fingerprint, time.monotonic() >= deadline)
+        if response is not WAIT:
+            return response
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def store(key, response):
+    """
+    Saves the response under the key so retries get it replayed.
+    Server errors and streamed responses are not kept: the key is released and a retry runs again.
+    """
+    if response.streaming or response.status_code >= 500:
+        release(key)
+        return
+
+    # DRF responses (e.g. for a wrong method or content type) are rendered after the view returns
+    if not getattr(response, 'is_rendered', True):
+        response.render()
+    IdempotencyKey.objects.filter(key=key, status_code__isnull=True).update(
+        status_code=response.status_code, content_type=response.get('Content-Type', ''), body=response.content
+    )
+
+
+def release(key):
+    """
+    Gives up an unfinished claim on the key.
+    """
+    IdempotencyKey.objects.filter(key=key, status_code__isnull=True).delete()
+
+
+def invalid_key(key):
+    """
+    Returns an error response for a malformed key, otherwise None.
+    """
+    if not key or len(key) > 255:
+        return JsonResponse({'error': 'Idempotency-Key must be between 1 and 255 characters long.'}, status=400)
+    return None
+
+
+def idempotent(view):
+    """
+    Makes a view honour the Idempotency-Key header.
+    The first request with a key executes and its response is stored; retries with the same key
+    get those bytes back without running the view, and duplicates arriving while it still runs
+    wait for it. Requests without the header are passed through unchanged.
+    Works on sync and async views.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if key is None:
+                return await view(request, *args, **kwargs)
+            error = invalid_key(key)
+            if error is not None:
+                return error
+
+            response = await aacquire(key, request_fingerprint(request))
+            if response is not None:
+                return response
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(release)(key)
+                raise
+            await sync_to_async(store)(key, response)
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return view(request, *args, **kwargs)
+        error = invalid_key(key)
+        if error is not None:
+            return error
+
+        response = acquire(key, request_fingerprint(request))
+        if response is not None:
+            return response
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            release(key)
+            raise
+        store(key, response)
+        return response
+
+    return wrapper
+
+
+def purge_idempotency_keys():
+    """
+    Deletes expired keys and returns how many were removed.
+    """
+    expired = timezone.now() - timedelta(seconds=settings.BOOKING_IDEMPOTENCY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired).delete()
+    return deleted
@@ -0,0 +1,160 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from booking.conditional import bookings_changed
+from booking.metrics import span
+from booking.models import Booking, QrJob
+from booking.qr import qr_on_demand, qr_payload, render_qr_png
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_qr_job(booking):
+    """
+    Queues QR generation for a booking and wakes the local worker pool once the transaction commits.
+    Call it inside the transaction that inserts the booking, so both rows are committed together.
+    Nothing is queued when QR codes are rendered on demand.
+    """
+    if qr_on_demand():
+        return
+    QrJob.objects.create(booking=booking)
+    transaction.on_commit(qr_worker_pool.wake)
+
+
+def enqueue_qr_jobs(bookings, batch_size=1000):
+    """
+    Queues QR generation for many bookings with bulk inserts; the batch counterpart of enqueue_qr_job.
+    """
+    if qr_on_demand():
+        return
+    QrJob.objects.bulk_create([QrJob(booking=booking) for booking in bookings], batch_size=batch_size)
+    transaction.on_commit(qr_worker_pool.wake)
+
+
+def claim_qr_jobs(batch_size):
+    """
+    Claims up to batch_size due jobs for this worker and returns them with their bookings.
+    Jobs left running by a crashed worker become claimable again after BOOKING_QR_JOB_TIMEOUT.
+    The claim is a single conditional UPDATE, so concurrent workers never get the same job.
+    """
+    now = timezone.now()
+    claimable = Q(status=QrJob.Status.PENDING, run_after__lte=now) | Q(
+        status=QrJob.Status.RUNNING, updated_at__lt=now - timedelta(seconds=settings.BOOKING_QR_JOB_TIMEOUT)
+    )
+    due_ids = QrJob.objects.filter(claimable).order_by('run_after', 'id').values_list('id', flat=True)[:batch_size]
+
+    claim_token = uuid.uuid4()
+    claimed = QrJob.objects.filter(claimable, id__in=list(due_ids)).update(
+        status=QrJob.Status.RUNNING, claim_token=claim_token, attempts=F('attempts') + 1, updated_at=now
+    )
+    if not claimed:
+        return []
+    return list(QrJob.objects.filter(claim_token=claim_token).select_related('booking'))
+
+
+def run_qr_jobs(jobs):
+    """
+    Renders the QR codes of a batch of claimed jobs and records the outcome of every job.
+    Successful bookings and jobs are written back with one bulk UPDATE each.
+    """
+    now = timezone.now()
+    bookings = []
+    for job in jobs:
+        booking = job.booking
+        try:
+            png = render_qr_png(qr_payload(booking))
+            with span('run_qr_jobs', 'store'):
+                booking.qr_code.save(f"qr_{booking.id}.png", ContentFile(png), save=False)
+        except Exception as exc:
+            logger.exception("QR generation failed for booking %s", booking.id)
+            job.last_error = str(exc)
+            if job.attempts >= settings.BOOKING_QR_MAX_ATTEMPTS:
+                job.status = QrJob.Status.FAILED
+                booking.qr_status = Booking.QrStatus.FAILED
+            else:
+                # Back off exponentially before the next attempt
+                job.status = QrJob.Status.PENDING
+                job.run_after = now + timedelta(seconds=2 ** job.attempts)
+        else:
+            job.status = QrJob.Status.DONE
+            job.last_error = ''
+            booking.qr_status = Booking.QrStatus.READY
+
+        job.claim_token = None
+        job.updated_at = now
+        booking.updated_at = now
+        bookings.append(booking)
+
+    with span('run_qr_jobs', 'save'), transaction.atomic():
+        Booking.objects.bulk_update(bookings, ['qr_code', 'qr_status', 'updated_at'])
+        QrJob.objects.bulk_update(jobs, ['status', 'last_error', 'run_after', 'claim_token', 'updated_at'])
+        bookings_changed([booking.id for booking in bookings])
+
+
+def process_qr_jobs(batch_size=None):
+    """
+    Claims and runs batches of jobs until none are due. Returns the number of jobs processed.
+    """
+    batch_size = batch_size or settings.BOOKING_QR_BATCH_SIZE
+    processed = 0
+    while jobs := claim_qr_jobs(batch_size):
+        run_qr_jobs(jobs)
+        processed += len(jobs)
+    return processed
+
+
+class QrWorkerPool:
+    """
+    Local pool of threads that drains the QR job table in the background.
+    Waking a busy pool only flags another pass, so bursts of bookings are handled in
+    batches by the running drains. With BOOKING_QR_WORKERS set to 0 the pool stays idle
+    and jobs are left to the process_qr_jobs command.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._pending = False
+
+    def wake(self):
+        workers = settings.BOOKING_QR_WORKERS
+        if not workers:
+            return
+
+        with self._lock:
+            self._pending = True
+            if self._active >= workers:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qr-worker')
+            self._active += 1
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._active -= 1
+                        return
+                    self._pending = False
+                try:
+                    process_qr_jobs()
+                except Exception:
+                    logger.exception("QR worker failed; remaining jobs stay queued")
+        finally:
+            # Worker threads are long-lived, so release their database connections between drains
+            connections.close_all()
+
+
+qr_worker_pool = QrWorkerPool()
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from booking.archive import archive_bookings
+
+
+class Command(BaseCommand):
+    """
+    Moves past bookings out of the hot table into the archive in small batches.
+    Meant to run periodically (e.g. nightly from cron).
+    """
+    help = "Moves bookings older than BOOKING_ARCHIVE_AFTER_DAYS into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Archive bookings older than this many days; never less than BOOKING_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Bookings moved per transaction.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        before = None
+        if options['days'] is not None:
+            before = timezone.now() - timedelta(days=options['days'])
+
+        moved = archive_bookings(before, batch_size=options['batch_size'])
+        self.stdout.write(f"Archived {moved} booking(s).")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from booking.conditional import bookings_changed
+from booking.models import Booking, QrJob
+from booking.qr import qr_on_demand
+
+
+class Command(BaseCommand):
+    """
+    Queues QR jobs for bookings that have no QR code and no job in progress,
+    e.g. bookings imported directly into the database.
+    """
+    help = "Queues QR code jobs for bookings that are missing a QR code."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Bookings queued per transaction.")
+
+    def handle(self, *args, **options):
+        if qr_on_demand():
+            raise CommandError("QR codes are rendered on demand (BOOKING_QR_MODE=on_demand); there is nothing to backfill.")
+
+        missing = Booking.objects.filter(Q(qr_code__isnull=True) | Q(qr_code='')).order_by('id')
+        queued = 0
+        last_id = 0
+        while True:
+            booking_ids = list(missing.filter(id__gt=last_id).values_list('id', flat=True)[:options['batch_size']])
+            if not booking_ids:
+                break
+            last_id = booking_ids[-1]
+
+            with transaction.atomic():
+                # Bookings whose job finished or failed without a file get their job reset
+                QrJob.objects.filter(booking_id__in=booking_ids).exclude(
+                    status__in=[QrJob.Status.PENDING, QrJob.Status.RUNNING]
+                ).update(status=QrJob.Status.PENDING, attempts=0, last_error='', run_after=timezone.now())
+                existing = set(QrJob.objects.filter(booking_id__in=booking_ids).values_list('booking_id', flat=True))
+                QrJob.objects.bulk_create(
+                    [QrJob(booking_id=booking_id) for booking_id in booking_ids if booking_id not in existing]
+                )
+                Booking.objects.filter(id__in=booking_ids).update(qr_status=Booking.QrStatus.PENDING, updated_at=timezone.now())
+                bookings_changed(booking_ids)
+            queued += len(booking_ids)
+
+        self.stdout.write(f"Queued {queued} booking(s) for QR generation.")
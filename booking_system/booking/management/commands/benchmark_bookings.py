@@ -0,0 +1,232 @@
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as day_time, timedelta, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from booking.availability import slots_per_day
+from booking.models import Booking, default_resource_id
+from booking.tickets import ticket_cache
+
+
+class Command(BaseCommand):
+    """
+    Reproducible load and latency benchmark of the booking API.
+
+    Runs against a throwaway copy of the test database, seeds it at each requested scale,
+    drives every endpoint through the Django test client sequentially and under concurrent
+    load, and writes latency percentiles, throughput, query counts and peak memory as JSON
+    so runs can be compared across commits.
+    """
+    help = "Benchmarks the booking endpoints at several table sizes and writes the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,100000,1000000',
+                            help="Comma-separated numbers of seeded bookings.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Client threads in the concurrent mode.")
+        parser.add_argument('--memory-requests', type=int, default=20,
+                            help="Requests measured with tracemalloc for peak memory.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for booking selection.")
+        parser.add_argument('--output', default='benchmark_results.json', help="Path of the JSON results file.")
+
+    def handle(self, *args, **options):
+        try:
+            scales = sorted(int(scale) for scale in options['scales'].split(','))
+        except ValueError:
+            raise CommandError("--scales must be a comma-separated list of integers.")
+
+        self.random = random.Random(options['seed'])
+        self.first_day = datetime.now(tz=timezone.utc).date() + timedelta(days=1)
+        # Shared by the client threads; next() on a count is atomic
+        self.create_slots = itertools.count(1)
+
+        # Never touch the real database: benchmark against a fresh test database
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        results = []
+        try:
+            # Keep background work and the per-client rate limits (all requests come from one client) out of the measurements
+            with override_settings(BOOKING_QR_WORKERS=0, BOOKING_RATE_PER_CLIENT=0, BOOKING_RATE_PER_CIVIL_ID=0):
+                for scale in scales:
+                    self.seed(scale)
+                    for endpoint, make_request in self.endpoints():
+                        results += self.measure(scale, endpoint, make_request, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'commit': self.git_commit(),
+            'timestamp': datetime.now(tz=timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {key: options[key] for key in ('scales', 'requests', 'concurrency', 'memory_requests', 'seed')},
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
+
+    def slot(self, index):
+        """
+        Returns the start time of the index-th slot counted from tomorrow's first slot.
+        """
+        day = self.first_day + timedelta(days=index // slots_per_day())
+        window_start = datetime.combine(day, day_time(settings.BOOKING_STARTING_WINDOW_TIME), tzinfo=timezone.utc)
+        return window_start + (index % slots_per_day()) * timedelta(minutes=settings.BOOKING_DURATION)
+
+    def seed(self, scale):
+        """
+        Tops the table up to the given number of bookings with bulk inserts.
+        Created bookings take slots far beyond the seeded ones, so they never collide.
+        """
+        existing = Booking.objects.count()
+        resource_id = default_resource_id()
+        batch_size = 10000
+        for start in range(existing, scale, batch_size):
+            Booking.objects.bulk_create([
+                Booking(name=f'Benchmark {index}', civil_id=100000000000 + index, resource_id=resource_id,
+                        start_time=self.slot(index))
+                for index in range(start, min(start + batch_size, scale))
+            ])
+        self.scale = scale
+        self.booking_ids = list(Booking.objects.values_list('id', flat=True)[:10000])
+        self.stdout.write(f"Seeded {scale} bookings.")
+
+    def endpoints(self):
+        """
+        Returns (name, request function) pairs; each function performs one request with the given client.
+        """
+        def create(client):
+            start_time = self.slot(10 * self.scale + next(self.create_slots))
+            return client.post(reverse('booking:create_booking'), {
+                'name': 'Benchmark', 'civil_id': '123456789012', 'start_time': start_time.strftime('%Y-%m-%d %H:%M'),
+            })
+
+        def list_page(client):
+            return client.get(reverse('booking:get_all_bookings'))
+
+        def availability(client):
+            first_day = self.first_day + timedelta(days=self.random.randrange(max(self.scale // slots_per_day(), 1)))
+            return client.get(reverse('booking:get_availability'), {
+                'from': first_day.isoformat(), 'to': (first_day + timedelta(days=6)).isoformat(),
+            })
+
+        def pdf(client):
+            return client.get(reverse('booking:generate_booking_pdf'), {
+                'booking_id': self.random.choice(self.booking_ids),
+            })
+
+        return [
+            ('create_booking', create),
+            ('get_all_bookings', list_page),
+            ('get_availability', availability),
+            ('generate_booking_pdf', pdf),
+        ]
+
+    def measure(self, scale, endpoint, make_request, options):
+        """
+        Measures one endpoint sequentially and under concurrent load.
+        """
+        cache.clear()
+        ticket_cache().clear()
+        client = Client()
+
+        # Sequential run: latency and queries per request
+        latencies, errors = [], 0
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                response = make_request(client)
+                latencies.append(time.perf_counter() - request_started)
+                errors += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+        sequential = self.summary(scale, endpoint, 'sequential', latencies, elapsed, errors)
+        sequential['queries_per_request'] = round(len(queries) / options['requests'], 2)
+
+        # Memory run: peak Python allocations while serving requests
+        reset_queries()
+        tracemalloc.start()
+        for _ in range(options['memory_requests']):
+            make_request(client)
+        sequential['peak_memory_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+        # Concurrent run: every thread gets its own client and database connection
+        def worker(count):
+            worker_client = Client()
+            worker_latencies, worker_errors = [], 0
+            try:
+                for _ in range(count):
+                    request_started = time.perf_counter()
+                    response = make_request(worker_client)
+                    worker_latencies.append(time.perf_counter() - request_started)
+                    worker_errors += response.status_code >= 400
+            finally:
+                connections.close_all()
+            return worker_latencies, worker_errors
+
+        per_thread = max(options['requests'] // options['concurrency'], 1)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            outcomes = list(executor.map(worker, [per_thread] * options['concurrency']))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+        concurrent = self.summary(scale, endpoint, 'concurrent', latencies, elapsed, sum(e for _, e in outcomes))
+        concurrent['concurrency'] = options['concurrency']
+
+        for result in (sequential, concurrent):
+            self.stdout.write(
+                f"{scale:>9} {endpoint:<22} {result['mode']:<10} p50={result['p50_ms']:.2f}ms "
+                f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms {result['throughput_rps']:.1f} req/s "
+                f"errors={result['errors']}"
+            )
+        return [sequential, concurrent]
+
+    @staticmethod
+    def summary(scale, endpoint, mode, latencies, elapsed, errors):
+        """
+        Summarizes request latencies (in seconds) into percentiles and throughput.
+        """
+        latencies_ms = [latency * 1000 for latency in latencies] or [0.0]
+        cut_points = statistics.quantiles(latencies_ms, n=100, method='inclusive') if len(latencies_ms) > 1 \
+            else latencies_ms * 99
+        return {
+            'scale': scale,
+            'endpoint': endpoint,
+            'mode': mode,
+            'requests': len(latencies),
+            'errors': errors,
+            'mean_ms': round(statistics.fmean(latencies_ms), 3),
+            'p50_ms': round(cut_points[49], 3),
+            'p95_ms': round(cut_points[94], 3),
+            'p99_ms': round(cut_points[98], 3),
+            'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        }
+
+    @staticmethod
+    def git_commit():
+        """
+        Returns the current git commit, if the code runs from a checkout.
+        """
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
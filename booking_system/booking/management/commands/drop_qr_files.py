@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from booking.conditional import bookings_changed
+from booking.models import ArchivedBooking, Booking, QrJob
+from booking.qr import qr_on_demand
+
+
+class Command(BaseCommand):
+    """
+    Finishes the switch to on-demand QR codes: deletes the stored QR images of all bookings,
+    current and archived, clears their qr_code fields and drops the QR job queue.
+    """
+    help = "Deletes stored QR code files once BOOKING_QR_MODE is 'on_demand'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Bookings updated per transaction.")
+
+    def handle(self, *args, **options):
+        if not qr_on_demand():
+            raise CommandError("Set BOOKING_QR_MODE=on_demand first; stored mode still serves the files.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        # Nothing renders into storage any more
+        QrJob.objects.all().delete()
+
+        deleted = 0
+        for model in (Booking, ArchivedBooking):
+            storage = model._meta.get_field('qr_code').storage
+            # Bookings with a stored file, and those whose file was never rendered, which have their QR code now as well
+            stale = model.objects.filter(Q(qr_code__gt='') | ~Q(qr_status=Booking.QrStatus.READY)).order_by('id')
+            while rows := list(stale.values_list('id', 'qr_code')[:options['batch_size']]):
+                booking_ids = [booking_id for booking_id, _ in rows]
+                with transaction.atomic():
+                    # Clear the references first, so no response links a file after it is gone
+                    model.objects.filter(id__in=booking_ids).update(
+                        qr_code='', qr_status=Booking.QrStatus.READY, updated_at=timezone.now()
+                    )
+                    bookings_changed(booking_ids)
+                for _, name in rows:
+                    if name:
+                        storage.delete(name)
+                        deleted += 1
+
+        self.stdout.write(f"Deleted {deleted} stored QR code(s).")
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.exports import EXPORT_CONTENT_TYPES, EXPORT_FILTERS, export_filters, export_stream
+from booking.replicas import pick_replica, reading_from
+
+
+class Command(BaseCommand):
+    """
+    Writes bookings as NDJSON or CSV for reporting, with the filters of the export endpoint.
+    Rows are streamed through server-side cursors, so nightly dumps run in constant memory.
+    For incremental extraction pass the updated_at of the last row of the previous run as --since.
+    Reads go to a read replica when there is one.
+    """
+    help = "Exports bookings as NDJSON or CSV to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_CONTENT_TYPES), default='ndjson', help="Output format.")
+        parser.add_argument('--output', help="File to write to (stdout by default).")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+        for name in EXPORT_FILTERS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                                help=f"Filter {name} (YYYY-MM-DD or an ISO 8601 date-time).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = export_filters(options)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from None
+
+        with reading_from(pick_replica()):
+            chunks = export_stream(filters, options['format'], compress=options['gzip'])
+            if options['output']:
+                with open(options['output'], 'wb') as output:
+                    for chunk in chunks:
+                        output.write(chunk)
+            else:
+                output = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+                for chunk in chunks:
+                    output.write(chunk)
+                output.flush()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from booking.openapi import forget_schema_artifacts, openapi_dir, read_manifest, source_fingerprint, write_artifacts
+
+
+class Command(BaseCommand):
+    """
+    Writes the OpenAPI schema as versioned JSON and YAML files that the schema endpoints serve as is.
+    Run it at build or deploy time; it does nothing while the code is unchanged since the last run.
+    """
+    help = "Generates the OpenAPI schema artifacts in BOOKING_OPENAPI_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=openapi_dir(), help="Directory the artifacts are written to.")
+        parser.add_argument('--force', action='store_true', help="Regenerate even if the code has not changed.")
+
+    def handle(self, *args, **options):
+        fingerprint = source_fingerprint()
+        manifest = read_manifest(options['output'])
+        if not options['force'] and manifest and manifest.get('source') == fingerprint:
+            self.stdout.write(f"OpenAPI schema {manifest['version']} is up to date.")
+            return
+
+        version = write_artifacts(options['output'], fingerprint)
+        forget_schema_artifacts()
+        self.stdout.write(f"Wrote OpenAPI schema {version} to {options['output']}.")
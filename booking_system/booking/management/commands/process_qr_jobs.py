@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.jobs import process_qr_jobs
+
+
+class Command(BaseCommand):
+    """
+    Runs a QR code worker against the job table.
+    Use it instead of (or next to) the in-process pool, e.g. as a separate service.
+    """
+    help = "Generates QR codes for queued bookings in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due jobs and exit instead of polling.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Jobs claimed per batch.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when no job is due.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_qr_jobs(options['batch_size'])
+            if processed:
+                self.stdout.write(f"Processed {processed} QR job(s).")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Starts a fresh interpreter that loads the application the way a worker does, with
+    `python -X importtime`, and reports the import time per top-level package.
+    Fails when the total exceeds the budget, so it can guard startup time in CI.
+    """
+    help = "Reports worker import time per package and checks it against BOOKING_IMPORT_BUDGET_MS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=float, default=settings.BOOKING_IMPORT_BUDGET_MS,
+                            help="Largest total import time allowed, in milliseconds.")
+        parser.add_argument('--top', type=int, default=15, help="Number of packages listed.")
+        parser.add_argument('--module', action='append', default=[],
+                            help="Additional module imported after startup (repeatable).")
+
+    def handle(self, *args, **options):
+        # What a worker imports before serving: the WSGI application and the URLconf with all views
+        wsgi_module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        code = '; '.join([
+            f'import {wsgi_module}',
+            'from django.urls import get_resolver',
+            'get_resolver().url_patterns',
+            *(f'import {module}' for module in options['module']),
+        ])
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'booking_system.settings'),
+               'BOOKING_PRELOAD': 'false'}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env, cwd=settings.BASE_DIR
+        )
+        if result.returncode:
+            raise CommandError(f"Starting the application failed:\n{result.stderr[-2000:]}")
+
+        # Lines look like "import time: <self us> | <cumulative us> | <indented module>"
+        packages = defaultdict(int)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, module = line[len('import time:'):].split('|')
+            packages[module.strip().split('.')[0]] += int(self_us)
+
+        total_ms = sum(packages.values()) / 1000
+        ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        width = max((len(name) for name, _ in ranked[:options['top']]), default=0)
+        for name, self_us in ranked[:options['top']]:
+            self.stdout.write(f"{name:<{width}}  {self_us / 1000:8.1f} ms  {self_us / 10 / total_ms if total_ms else 0:5.1f}%")
+        self.stdout.write(f"Total: {total_ms:.1f} ms in {len(packages)} package(s), budget {options['budget']:.0f} ms.")
+
+        if total_ms > options['budget']:
+            raise CommandError(f"Imports took {total_ms:.1f} ms, over the {options['budget']:.0f} ms budget.")
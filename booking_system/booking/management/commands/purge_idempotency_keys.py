@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from booking.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    """
+    Removes stored Idempotency-Key responses that are past their TTL.
+    Meant to run periodically (e.g. hourly from cron).
+    """
+    help = "Deletes idempotency keys older than BOOKING_IDEMPOTENCY_TTL."
+
+    def handle(self, *args, **options):
+        deleted = purge_idempotency_keys()
+        self.stdout.write(f"Purged {deleted} idempotency key(s).")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking.conditional import bookings_changed
+from booking.models import Booking, QrJob
+
+
+class Command(BaseCommand):
+    """
+    Puts failed QR jobs back in the queue with a fresh set of attempts.
+    """
+    help = "Requeues failed QR code jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('booking_ids', nargs='*', type=int, help="Only retry the jobs of these bookings.")
+
+    def handle(self, *args, **options):
+        jobs = QrJob.objects.filter(status=QrJob.Status.FAILED)
+        if options['booking_ids']:
+            jobs = jobs.filter(booking_id__in=options['booking_ids'])
+
+        with transaction.atomic():
+            booking_ids = list(jobs.values_list('booking_id', flat=True))
+            retried = jobs.update(
+                status=QrJob.Status.PENDING, attempts=0, last_error='', run_after=timezone.now(), updated_at=timezone.now()
+            )
+            Booking.objects.filter(id__in=booking_ids).update(qr_status=Booking.QrStatus.PENDING, updated_at=timezone.now())
+            bookings_changed(booking_ids)
+
+        self.stdout.write(f"Requeued {retried} QR job(s).")
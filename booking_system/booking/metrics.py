@@ -0,0 +1,108 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+# Buckets tuned for web requests: 1 ms to 10 s
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+request_duration = Histogram(
+    'booking_http_request_duration_seconds', 'Request latency by route.',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+request_db_queries = Histogram(
+    'booking_http_request_db_queries', 'Database queries executed per request by route.',
+    ['route'], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+request_db_duration = Histogram(
+    'booking_http_request_db_duration_seconds', 'Time spent in database queries per request by route.',
+    ['route'], buckets=LATENCY_BUCKETS,
+)
+phase_duration = Histogram(
+    'booking_phase_duration_seconds', 'Duration of the phases inside views and workers.',
+    ['operation', 'phase'], buckets=LATENCY_BUCKETS,
+)
+ticket_cache_requests = Counter(
+    'booking_ticket_cache_requests_total', 'Rendered ticket cache lookups by result.', ['result'],
+)
+qr_cache_requests = Counter(
+    'booking_qr_cache_requests_total', 'Encoded QR code cache lookups by result.', ['result'],
+)
+admission_rejections = Counter(
+    'booking_admission_rejections_total', 'Requests turned away by admission control by route and reason.',
+    ['route', 'reason'],
+)
+replica_reads = Counter(
+    'booking_replica_reads_total', 'Requests of the replica-routed views by database served from.', ['database'],
+)
+idempotent_requests = Counter(
+    'booking_idempotent_requests_total', 'Requests carrying an Idempotency-Key by outcome.', ['result'],
+)
+
+
+class QueryStats:
+    """
+    Number of database queries of one request and the time spent in them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Query stats of the request being served; context variables follow the request into
+# sync_to_async worker threads, so async views are measured as well
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding every query to the stats of the current request.
+    """
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created handler installing record_query on every new database connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def span(operation, phase):
+    """
+    Times one phase of an operation, e.g. span('generate_booking_pdf', 'render').
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_duration.labels(operation, phase).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """
+    Returns the content type and body of the Prometheus text exposition.
+    When PROMETHEUS_MULTIPROC_DIR is set, the values of all worker processes are aggregated.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return CONTENT_TYPE_LATEST, generate_latest(registry)
@@ -0,0 +1,146 @@
+import cProfile
+import heapq
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from booking.metrics import (
+    QueryStats, current_query_stats, request_db_duration, request_db_queries, request_duration
+)
+from booking.replicas import PRIMARY_COOKIE
+
+
+class SlowRequestProfiles:
+    """
+    Keeps cProfile dumps of the slowest sampled requests in BOOKING_PROFILE_DIR,
+    deleting a dump once BOOKING_PROFILE_KEEP slower requests have been seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slowest = []
+
+    def record(self, profile, duration, route):
+        with self._lock:
+            if len(self._slowest) >= settings.BOOKING_PROFILE_KEEP and duration <= self._slowest[0][0]:
+                return
+
+            os.makedirs(settings.BOOKING_PROFILE_DIR, exist_ok=True)
+            filename = os.path.join(
+                settings.BOOKING_PROFILE_DIR,
+                f"{duration * 1000:09.1f}ms-{route.replace(':', '-')}-{time.time_ns()}.prof",
+            )
+            profile.dump_stats(filename)
+            heapq.heappush(self._slowest, (duration, filename))
+            if len(self._slowest) > settings.BOOKING_PROFILE_KEEP:
+                _, evicted = heapq.heappop(self._slowest)
+                os.remove(evicted)
+
+
+slow_request_profiles = SlowRequestProfiles()
+
+
+class MetricsMiddleware:
+    """
+    Records per-route latency, database query count and database time for every request.
+    A BOOKING_PROFILE_SAMPLE_RATE share of sync requests additionally runs under cProfile,
+    and the profiles of the slowest of them are kept for inspection.
+    Works for both WSGI and ASGI, so async views are not adapted to sync code.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        profile = None
+        if settings.BOOKING_PROFILE_SAMPLE_RATE and random.random() < settings.BOOKING_PROFILE_SAMPLE_RATE:
+            profile = cProfile.Profile()
+
+        started = time.perf_counter()
+        try:
+            if profile is not None:
+                profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profile is not None:
+                    profile.disable()
+        finally:
+            current_query_stats.reset(token)
+        duration = time.perf_counter() - started
+
+        route = self.observe(request, response, duration, stats)
+        if profile is not None:
+            slow_request_profiles.record(profile, duration, route)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration, stats):
+        """
+        Records the measurements of one request and returns its route label.
+        Streaming responses are measured up to the first byte.
+        """
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        request_duration.labels(route, request.method, response.status_code).observe(duration)
+        request_db_queries.labels(route).observe(stats.count)
+        request_db_duration.labels(route).observe(stats.duration)
+        return route
+
+
+class PrimaryAfterWriteMiddleware:
+    """
+    Gives clients that made a successful write a cookie sending their reads to the primary for
+    BOOKING_REPLICA_MAX_LAG seconds, until the replicas have caught up with the write.
+    Does nothing without read replicas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.mark_writer(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.mark_writer(request, await self.get_response(request))
+
+    @staticmethod
+    def mark_writer(request, response):
+        """
+        Sets the cookie on the response to a successful unsafe request.
+        """
+        if settings.BOOKING_READ_REPLICAS and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1', max_age=settings.BOOKING_REPLICA_MAX_LAG, httponly=True, samesite='Lax'
+            )
+        return response
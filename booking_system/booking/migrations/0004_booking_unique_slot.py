@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_created_at_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('start_time',), name='unique_booking_slot'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_qr_codes_ready(apps, schema_editor):
+    """
+    Bookings created before the job pipeline already have their QR code on disk.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    Booking.objects.exclude(qr_code__isnull=True).exclude(qr_code='').update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_booking_unique_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_qr_codes_ready, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='QrJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim_token', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='qr_job', to='booking.booking')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='qr_job_claim_idx')],
+            },
+        ),
+    ]
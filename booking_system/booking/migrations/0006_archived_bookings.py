@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_qr_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('civil_id', models.BigIntegerField()),
+                ('start_time', models.DateTimeField()),
+                ('qr_code', models.ImageField(blank=True, null=True, upload_to='qr_codes/')),
+                ('qr_status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start_time', 'id'], name='archived_booking_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:52
+
+import booking.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def assign_default_resource(apps, schema_editor):
+    """
+    Puts every existing booking on the default resource and builds its slot counters.
+    """
+    Resource = apps.get_model('booking', 'Resource')
+    Booking = apps.get_model('booking', 'Booking')
+    ArchivedBooking = apps.get_model('booking', 'ArchivedBooking')
+    SlotOccupancy = apps.get_model('booking', 'SlotOccupancy')
+
+    resource, _ = Resource.objects.get_or_create(name=settings.BOOKING_DEFAULT_RESOURCE)
+    Booking.objects.update(resource=resource)
+    ArchivedBooking.objects.update(resource=resource)
+    SlotOccupancy.objects.bulk_create(
+        [
+            SlotOccupancy(resource=resource, start_time=slot['start_time'], booked=slot['booked'])
+            for slot in Booking.objects.values('start_time').annotate(booked=Count('id')).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_archived_bookings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('capacity', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking.resource')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('resource', 'start_time'), name='unique_slot_occupancy')],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='resource',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.resource'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='resource',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.resource'),
+        ),
+        migrations.RunPython(assign_default_resource, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedbooking',
+            name='resource',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.resource'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='resource',
+            field=models.ForeignKey(default=booking.models.default_resource_id, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.resource'),
+        ),
+        # Slot capacity is enforced by the occupancy counters now, so a slot may hold several bookings
+        migrations.RemoveConstraint(
+            model_name='booking',
+            name='unique_booking_slot',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['start_time', 'id'], name='booking_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['resource', 'start_time'], name='booking_resource_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['civil_id', 'start_time', 'id'], name='archived_booking_civil_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='archived_booking_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['civil_id', 'start_time', 'id'], name='booking_civil_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='booking_name_prefix_idx'),
+        ),
+    ]
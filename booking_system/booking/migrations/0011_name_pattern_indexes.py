@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Indexes on UPPER(name) with text_pattern_ops, which let PostgreSQL serve case-insensitive name
+# prefixes (UPPER(name) LIKE 'P%') under any collation. The expression matches the one Django
+# generates for istartswith. Other databases match prefixes with the plain UPPER(name) indexes.
+PATTERN_INDEXES = [
+    ('booking', 'booking_name_pattern_idx'),
+    ('archivedbooking', 'archived_booking_name_pattern_idx'),
+]
+
+
+def create_pattern_indexes(apps, schema_editor):
+    """
+    Creates the pattern indexes on PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index_name in PATTERN_INDEXES:
+        table = apps.get_model('booking', model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {schema_editor.quote_name(index_name)} '
+            f'ON {schema_editor.quote_name(table)} ((UPPER("name"::text)) text_pattern_ops)'
+        )
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    """
+    Drops the pattern indexes on PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, index_name in PATTERN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_booking_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
@@ -1,4 +1,142 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from booking.events import slots_changed
+
+
+class SlotTakenError(Exception):
+    """
+    Raised when the requested time slot has no capacity left on the resource.
+    """
+
+
+class Resource(models.Model):
+    """
+    Bookable resource, such as a counter or a room, taking up to `capacity` bookings per slot.
+    """
+    # Unique display name of the resource
+    name = models.CharField(max_length=255, unique=True)
+
+    # Number of bookings the resource can take in one slot
+    capacity = models.PositiveIntegerField(default=1)
+
+    # Timestamp for when the resource was created (auto-filled)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} (capacity {self.capacity})"
+
+
+def default_resource_id():
+    """
+    Returns the ID of the default resource (BOOKING_DEFAULT_RESOURCE), creating it on first use.
+    Bookings that do not name a resource are made on it. The resource is served from the resource
+    cache, since this runs for every booking constructed without one.
+    """
+    from booking.resources import get_resource
+
+    return get_resource().pk
+
+
+class SlotOccupancyManager(models.Manager):
+    """
+    Admission control on the per-(resource, slot) booking counters.
+    """
+
+    def _capacity(self):
+        return Subquery(Resource.objects.filter(pk=OuterRef('resource_id')).values('capacity')[:1])
+
+    def occupy(self, resource_id, start_time):
+        """
+        Takes one place in a slot with a single conditional UPDATE of its counter.
+        The first booking of a slot creates the counter row. Raises SlotTakenError when the slot is full.
+        """
+        counter = self.filter(resource_id=resource_id, start_time=start_time, booked__lt=self._capacity())
+        if counter.update(booked=F('booked') + 1):
+            return
+
+        # Either the slot is full or it has no counter yet; create it (a no-op if it exists) and retry
+        self.bulk_create([self.model(resource_id=resource_id, start_time=start_time)], ignore_conflicts=True)
+        if not counter.update(booked=F('booked') + 1):
+            raise SlotTakenError('A booking already exists for the selected time slot.')
+
+    def occupy_many(self, counts, batch_size=1000):
+        """
+        Takes places in many slots at once; counts maps (resource_id, start_time) to the places needed.
+        Missing counters are inserted with their final counts. Existing ones are raised with one
+        conditional UPDATE per resource, number of places and batch of slots, so no statement grows
+        with the number of distinct slots. Raises SlotTakenError when any slot lacks capacity, and the
+        caller's transaction must then be rolled back. Must run inside a transaction.
+        """
+        if not counts:
+            return
+
+        resource_ids = {resource_id for resource_id, _ in counts}
+        capacities = dict(Resource.objects.filter(pk__in=resource_ids).values_list('pk', 'capacity'))
+        start_times = [start_time for _, start_time in counts]
+        existing = set(self.filter(
+            resource_id__in=capacities, start_time__gte=min(start_times), start_time__lte=max(start_times),
+        ).values_list('resource_id', 'start_time'))
+
+        # Slots of one resource taking the same number of places share an UPDATE
+        groups = {}
+        missing = []
+        for (resource_id, start_time), places in counts.items():
+            if places > capacities.get(resource_id, 0):
+                raise SlotTakenError('A booking already exists for the selected time slot.')
+            if (resource_id, start_time) in existing:
+                groups.setdefault((resource_id, places), []).append(start_time)
+            else:
+                missing.append(self.model(resource_id=resource_id, start_time=start_time, booked=places))
+
+        for (resource_id, places), slot_times in groups.items():
+            for offset in range(0, len(slot_times), batch_size):
+                batch = slot_times[offset:offset + batch_size]
+                updated = self.filter(
+                    resource_id=resource_id, start_time__in=batch, booked__lte=capacities[resource_id] - places,
+                ).update(booked=F('booked') + places)
+                if updated != len(batch):
+                    raise SlotTakenError('A booking already exists for the selected time slot.')
+
+        try:
+            with transaction.atomic():
+                self.bulk_create(missing, batch_size=batch_size)
+        except IntegrityError:
+            # A concurrent transaction created one of the counters after they were read
+            raise SlotTakenError('A booking already exists for the selected time slot.') from None
+
+    def release(self, resource_id, start_time):
+        """
+        Gives back the place of a cancelled booking.
+        """
+        self.filter(resource_id=resource_id, start_time=start_time, booked__gt=0).update(booked=F('booked') - 1)
+
+
+class SlotOccupancy(models.Model):
+    """
+    Materialized number of bookings per (resource, slot).
+    Admission is a conditional increment of this row instead of a count over the bookings;
+    the counter changes in the same transaction as the booking insert or delete.
+    """
+    # Resource and slot (start time aligned to the slot grid) the counter belongs to
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='occupancy')
+    start_time = models.DateTimeField()
+
+    # Number of places taken in the slot
+    booked = models.PositiveIntegerField(default=0)
+
+    objects = SlotOccupancyManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'start_time'], name='unique_slot_occupancy'),
+        ]
+
+    def __str__(self):
+        return f"{self.booked} booked on resource {self.resource_id} at {self.start_time}"
+
 
 class Booking(models.Model):
     """
@@ -12,21 +150,176 @@ class Booking(models.Model):
     # Civil ID of the person (stored as a big integer for large IDs)
     civil_id = models.BigIntegerField()
 
+    # Resource the booking is made on (the default resource unless given)
+    resource = models.ForeignKey(Resource, on_delete=models.PROTECT, related_name='bookings', default=default_resource_id)
+
     # Start time of the booking (required)
     start_time = models.DateTimeField()
 
     # QR code for the booking, stored as an image file (optional)
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
 
+    # Progress of the background QR code generation
+    class QrStatus(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    qr_status = models.CharField(max_length=10, choices=QrStatus.choices, default=QrStatus.PENDING)
+
     # Timestamp for when the booking was created (auto-filled)
     created_at = models.DateTimeField(auto_now_add=True)
 
     # Timestamp for when the booking was last updated (auto-updated)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Start times are aligned to the slot grid, so the start time is the slot key.
+            # Lists and range reads seek on (start_time, id), per-resource reads on (resource, start_time).
+            models.Index(fields=['start_time', 'id'], name='booking_start_idx'),
+            models.Index(fields=['resource', 'start_time'], name='booking_resource_slot_idx'),
+            # Front-desk lookups: a person's bookings in list order, and case-insensitive name prefixes
+            models.Index(fields=['civil_id', 'start_time', 'id'], name='booking_civil_id_idx'),
+            # Serves the prefix range on SQLite; PostgreSQL gets a text_pattern_ops index for LIKE (migration 0011)
+            models.Index(Upper('name'), name='booking_name_prefix_idx'),
+            # Incremental exports read the rows changed since a point in time
+            models.Index(fields=['updated_at', 'id'], name='booking_updated_idx'),
+        ]
+
     def __str__(self):
         """
         String representation of the booking.
         Useful for debugging or when displaying the object in the Django admin.
         """
         return f"Booking for {self.name} at {self.start_time}"
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the booking, taking its place in the slot counter in the same transaction.
+        A new booking, or one moved to another slot or resource, raises SlotTakenError when the slot is full.
+        """
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and update_fields is not None and not {'start_time', 'resource'} & set(update_fields):
+            # Saves that leave the slot alone cannot change the counters
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Booking.objects.filter(pk=self.pk).values_list('resource_id', 'start_time').first()
+            if previous != (self.resource_id, self.start_time):
+                SlotOccupancy.objects.occupy(self.resource_id, self.start_time)
+                if previous:
+                    SlotOccupancy.objects.release(*previous)
+                # Tell the live event streams once the change is committed
+                slots_changed(taken=[(self.resource_id, self.start_time)], freed=[previous] if previous else [])
+            super().save(*args, **kwargs)
+
+
+class QrJob(models.Model):
+    """
+    Durable background job that renders the QR code of a booking.
+    Jobs are claimed in batches by the local worker pool or the process_qr_jobs command
+    and retried with exponential backoff until they succeed or run out of attempts.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    # Booking whose QR code is rendered by this job
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='qr_job')
+
+    # Current state of the job
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+
+    # Number of attempts made so far and the error of the last failed one
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    # Earliest time the job may be picked up (pushed back after each failure)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Token of the worker batch that claimed the job
+    claim_token = models.UUIDField(null=True, blank=True)
+
+    # Timestamps for when the job was created and last changed
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='qr_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"QR job for booking {self.booking_id} ({self.status})"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Booking whose slot lies further in the past than the archive horizon.
+    Rows are moved here unchanged (same ID and timestamps) by the archive_bookings command,
+    so the hot Booking table only holds current and future slots and its indexes stay small.
+    Read endpoints include the archive whenever a requested range reaches into it.
+    """
+    # ID of the original booking, kept so links and tickets stay valid
+    id = models.BigIntegerField(primary_key=True)
+
+    # Copies of the booking fields
+    name = models.CharField(max_length=255)
+    civil_id = models.BigIntegerField()
+    resource = models.ForeignKey(Resource, on_delete=models.PROTECT, related_name='+')
+    start_time = models.DateTimeField()
+    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    qr_status = models.CharField(max_length=10, choices=Booking.QrStatus.choices, default=Booking.QrStatus.PENDING)
+
+    # Original timestamps; plain fields so copying does not reset them
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    # Timestamp for when the booking was moved to the archive
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_time', 'id'], name='archived_booking_start_idx'),
+            models.Index(fields=['civil_id', 'start_time', 'id'], name='archived_booking_civil_id_idx'),
+            models.Index(Upper('name'), name='archived_booking_name_idx'),
+            models.Index(fields=['updated_at', 'id'], name='archived_booking_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived booking for {self.name} at {self.start_time}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored under a client's Idempotency-Key header, replayed byte for byte when
+    the same request is retried. A row without a status_code is a request still in flight;
+    duplicates arriving meanwhile wait for it instead of running the request again.
+    Rows expire after BOOKING_IDEMPOTENCY_TTL and are removed by `manage.py purge_idempotency_keys`.
+    """
+    # Key chosen by the client
+    key = models.CharField(max_length=255, unique=True)
+
+    # Hash of the method, path and body of the request that first used the key
+    fingerprint = models.CharField(max_length=64)
+
+    # Stored response; the status code stays empty while the request is in flight
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    body = models.BinaryField(null=True, blank=True)
+
+    # Timestamp for when the key was claimed (reset when an abandoned claim is taken over)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_key_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} ({self.status_code or 'in flight'})"
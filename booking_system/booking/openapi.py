@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+import drf_yasg
+from django.conf import settings
+from django.utils import timezone
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+# The OpenAPI schema is built once by `manage.py generate_openapi` (at build or deploy time) and
+# served as static bytes. Introspecting every view takes long enough to show up as a CPU spike
+# whenever a client generator or probe fetches the schema.
+
+API_INFO = openapi.Info(
+    title="Slot Booking API",  # Title of the API
+    default_version='v1',  # API version
+    description="API documentation for the Slot Booking system",  # Brief description of the API
+    contact=openapi.Contact(email="sarahmkhalil95@gmail.com"),  # Contact email for API support
+)
+
+# File recording which schema version is current and the code it was generated from
+MANIFEST_NAME = 'openapi.manifest.json'
+
+# Content type of each artifact format
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+
+class SchemaArtifact(NamedTuple):
+    """
+    One encoded form of the schema, ready to be sent as is.
+    """
+    version: str
+    body: bytes
+    gzipped: bytes
+    content_type: str
+
+
+def openapi_dir():
+    """
+    Returns the directory holding the schema artifacts (BOOKING_OPENAPI_DIR).
+    """
+    return os.path.join(settings.BASE_DIR, settings.BOOKING_OPENAPI_DIR)
+
+
+def source_fingerprint():
+    """
+    Returns a hash of the project's Python sources and the drf_yasg version, which together
+    determine the schema. Artifacts generated from other sources are stale.
+    """
+    digest = hashlib.sha256(drf_yasg.__version__.encode())
+    base_dir = Path(settings.BASE_DIR)
+    for path in sorted(base_dir.rglob('*.py')):
+        if any(part.startswith('.') or part in ('venv', 'media') for part in path.relative_to(base_dir).parts):
+            continue
+        digest.update(str(path.relative_to(base_dir)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def generate_schema():
+    """
+    Introspects the API and returns the schema encoded as {format: bytes}.
+    """
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return {
+        'json': OpenAPICodecJson(validators=[]).encode(schema),
+        'yaml': OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def build_artifacts(encoded):
+    """
+    Wraps the encoded schema into artifacts versioned by a hash of their content.
+    """
+    version = hashlib.sha256(encoded['json']).hexdigest()[:16]
+    return {
+        schema_format: SchemaArtifact(version, body, gzip.compress(body, mtime=0), CONTENT_TYPES[schema_format])
+        for schema_format, body in encoded.items()
+    }
+
+
+def artifact_name(version, schema_format):
+    """
+    Returns the file name of one artifact.
+    """
+    return f'openapi-{version}.{schema_format}'
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of the artifacts in the directory, or None if there is none.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+def write_artifacts(directory, fingerprint):
+    """
+    Generates the schema and writes it as openapi-<version>.json/.yaml (plus .gz copies) to the
+    directory, removing the artifacts of earlier versions. Returns the new version.
+    """
+    artifacts = build_artifacts(generate_schema())
+    version = artifacts['json'].version
+
+    os.makedirs(directory, exist_ok=True)
+    for schema_format, artifact in artifacts.items():
+        name = artifact_name(version, schema_format)
+        Path(directory, name).write_bytes(artifact.body)
+        Path(directory, f'{name}.gz').write_bytes(artifact.gzipped)
+
+    manifest = {'version': version, 'source': fingerprint, 'generated_at': timezone.now().isoformat()}
+    Path(directory, MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+    # Only the current version is served
+    current = {artifact_name(version, schema_format) for schema_format in artifacts}
+    for path in Path(directory).glob('openapi-*'):
+        if path.name.removesuffix('.gz') not in current:
+            path.unlink()
+    return version
+
+
+def load_artifacts(directory, fingerprint):
+    """
+    Returns the artifacts written to the directory, or None when they are missing or were
+    generated from other sources.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get('source') != fingerprint:
+        return None
+
+    artifacts = {}
+    for schema_format, content_type in CONTENT_TYPES.items():
+        name = artifact_name(manifest['version'], schema_format)
+        try:
+            body = Path(directory, name).read_bytes()
+            gzipped = Path(directory, f'{name}.gz').read_bytes()
+        except OSError:
+            return None
+        artifacts[schema_format] = SchemaArtifact(manifest['version'], body, gzipped, content_type)
+    return artifacts
+
+
+_artifacts = None
+_artifacts_lock = threading.Lock()
+
+
+def schema_artifacts():
+    """
+    Returns the schema artifacts served by this process, loaded once from BOOKING_OPENAPI_DIR.
+    When they are missing or stale the schema is generated in memory, once per process.
+    """
+    global _artifacts
+    with _artifacts_lock:
+        if _artifacts is None:
+            _artifacts = (
+                load_artifacts(openapi_dir(), source_fingerprint())
+                or build_artifacts(generate_schema())
+            )
+        return _artifacts
+
+
+def forget_schema_artifacts():
+    """
+    Makes the next request load the artifacts again, e.g. after they were regenerated.
+    """
+    global _artifacts
+    with _artifacts_lock:
+        _artifacts = None
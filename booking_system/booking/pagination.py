@@ -0,0 +1,121 @@
+import base64
+import binascii
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_cursor(booking):
+    """
+    Encodes the keyset position of a booking as an opaque, URL-safe cursor.
+    """
+    raw = f"{booking.start_time.isoformat()}|{booking.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor into a (start_time, id) tuple.
+    Cursors always hold UTC times; anything else was not produced here and is rejected.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_time, booking_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        start_time, booking_id = datetime.fromisoformat(start_time), int(booking_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError('Invalid cursor.') from exc
+    # A naive time would fail the comparisons with the aware range bounds
+    if start_time.utcoffset() != timedelta(0):
+        raise InvalidCursorError('Invalid cursor.')
+    return start_time, booking_id
+
+
+def parse_limit(value):
+    """
+    Parses the requested page size, falling back to the default when none is given.
+    Raises ValueError with a client-facing message when it is invalid.
+    """
+    if value is None:
+        return settings.BOOKING_LIST_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer.') from None
+    if not 1 <= limit <= settings.BOOKING_LIST_MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {settings.BOOKING_LIST_MAX_PAGE_SIZE}.')
+    return limit
+
+
+def _seek(queryset, cursor):
+    """
+    Orders the queryset by (start_time, id) and skips everything up to the cursor position.
+    """
+    queryset = queryset.order_by('start_time', 'id')
+    if cursor:
+        start_time, booking_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(start_time__gt=start_time) | Q(start_time=start_time, id__gt=booking_id)
+        )
+    return queryset
+
+
+def _page(items, limit):
+    """
+    Splits the limit + 1 fetched rows into the page and the cursor of the next page.
+    """
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def keyset_page(queryset, cursor=None, limit=100):
+    """
+    Returns one page of the queryset ordered by (start_time, id) and the cursor of the next page.
+    Seeks past the cursor position instead of using OFFSET, so every page costs the same
+    no matter how deep into the table it is.
+    """
+    # Fetch one extra row to find out whether there is a next page
+    items = list(_seek(queryset, cursor)[:limit + 1])
+    return _page(items, limit)
+
+
+async def akeyset_page(queryset, cursor=None, limit=100):
+    """
+    Async version of keyset_page using async iteration over the queryset.
+    """
+    items = [item async for item in _seek(queryset, cursor)[:limit + 1]]
+    return _page(items, limit)
+
+
+def _position(item):
+    """
+    Returns the keyset position of a booking row or instance.
+    """
+    return item.start_time, item.id
+
+
+def merged_keyset_page(querysets, cursor=None, limit=100):
+    """
+    Like keyset_page, but over several querysets of bookings (e.g. the hot table and the archive).
+    Each queryset is seeked separately and the pages are merged in (start_time, id) order.
+    """
+    pages = [list(_seek(queryset, cursor)[:limit + 1]) for queryset in querysets]
+    items = list(islice(heapq.merge(*pages, key=_position), limit + 1))
+    return _page(items, limit)
+
+
+async def amerged_keyset_page(querysets, cursor=None, limit=100):
+    """
+    Async version of merged_keyset_page.
+    """
+    pages = [[item async for item in _seek(queryset, cursor)[:limit + 1]] for queryset in querysets]
+    items = list(islice(heapq.merge(*pages, key=_position), limit + 1))
+    return _page(items, limit)
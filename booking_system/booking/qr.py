@@ -0,0 +1,78 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import caches
+
+from booking.metrics import qr_cache_requests, span
+from booking.models import Booking
+from booking.slots import slot_duration
+
+
+def qr_on_demand():
+    """
+    Returns whether QR codes are rendered on demand (BOOKING_QR_MODE='on_demand') rather than stored as files.
+    """
+    return settings.BOOKING_QR_MODE == 'on_demand'
+
+
+def initial_qr_status():
+    """
+    Returns the QR status of a new booking: on demand its QR code is available right away.
+    """
+    return Booking.QrStatus.READY if qr_on_demand() else Booking.QrStatus.PENDING
+
+
+def qr_payload(booking):
+    """
+    Returns the text encoded in the QR code of a booking.
+    """
+    end_time = booking.start_time + slot_duration()
+    return f"Booking for '{booking.name}' from {booking.start_time} to {end_time}"
+
+
+def qr_version(updated_at):
+    """
+    Returns the version naming a booking's QR code in its URL (?v=), which changes with the booking.
+    """
+    return str(int(updated_at.timestamp()))
+
+
+def render_qr_png(payload):
+    """
+    Renders a QR code for the payload and returns the encoded PNG bytes.
+    """
+    # Imported on first use, so processes that never render a QR code do not load qrcode and Pillow
+    import qrcode
+
+    with span('render_qr_png', 'make'):
+        qr = qrcode.make(payload)
+    with span('render_qr_png', 'encode'):
+        qr_io = io.BytesIO()
+        qr.save(qr_io, format='PNG')
+    return qr_io.getvalue()
+
+
+def qr_cache():
+    """
+    Returns the bounded cache of encoded QR code PNGs.
+    """
+    return caches[settings.BOOKING_QR_CACHE_ALIAS]
+
+
+def get_qr_png(payload):
+    """
+    Returns the PNG of a QR code payload, rendering it only when it is not in the cache.
+    Entries are keyed by a hash of the payload, so a changed booking simply maps to a new
+    entry and nothing ever needs invalidating.
+    """
+    key = f'booking:qr:{hashlib.sha256(payload.encode()).hexdigest()}'
+    png = qr_cache().get(key)
+    if png is not None:
+        qr_cache_requests.labels('hit').inc()
+        return png
+
+    qr_cache_requests.labels('miss').inc()
+    png = render_qr_png(payload)
+    qr_cache().set(key, png)
+    return png
@@ -0,0 +1,202 @@
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from booking.metrics import replica_reads
+
+# Read replicas. Views decorated with reads_from_replica run their queries against one of the
+# BOOKING_READ_REPLICAS; all other reads, and every write, go to the primary. A client that has just
+# written reads from the primary for BOOKING_REPLICA_MAX_LAG seconds (see PrimaryAfterWriteMiddleware),
+# so it always sees its own bookings, and a replica that cannot be reached is left out for
+# BOOKING_REPLICA_RETRY_AFTER seconds while its reads fall back to the primary.
+
+# Cookie marking a client that wrote recently
+PRIMARY_COOKIE = 'booking_read_primary'
+
+# Database the reads of the current request go to; None leaves them on the primary
+read_alias = ContextVar('booking_read_alias', default=None)
+
+# Replicas that failed, with the monotonic time until which they are left out
+_unavailable = {}
+_unavailable_lock = threading.Lock()
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of replica-routed requests to their replica.
+    Writes always go to the primary, also for instances that were loaded from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database holds the same rows
+        return True
+
+
+@contextmanager
+def reading_from(alias):
+    """
+    Sends the reads inside the block to the given database (None for the primary).
+    """
+    token = read_alias.set(alias)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+def mark_unavailable(alias):
+    """
+    Leaves a failed replica out for BOOKING_REPLICA_RETRY_AFTER seconds.
+    """
+    with _unavailable_lock:
+        _unavailable[alias] = time.monotonic() + settings.BOOKING_REPLICA_RETRY_AFTER
+
+
+def replica_available(alias):
+    """
+    Returns whether the replica can be read from, connecting to it if needed.
+    """
+    with _unavailable_lock:
+        until = _unavailable.get(alias)
+        if until is not None:
+            if until > time.monotonic():
+                return False
+            del _unavailable[alias]
+
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+def replica_failed(alias):
+    """
+    Returns whether a database error raised while reading from the replica came from a broken connection.
+    """
+    connection = connections[alias]
+    return connection.connection is None or not connection.is_usable()
+
+
+def pick_replica():
+    """
+    Returns a random available replica, or None when there is none and reads go to the primary.
+    """
+    replicas = list(settings.BOOKING_READ_REPLICAS)
+    random.shuffle(replicas)
+    alias = next((alias for alias in replicas if replica_available(alias)), None)
+    replica_reads.labels(alias or DEFAULT_DB_ALIAS).inc()
+    return alias
+
+
+def choose_replica(request):
+    """
+    Returns the replica to serve a request's reads from, or None for the primary:
+    clients that wrote in the last BOOKING_REPLICA_MAX_LAG seconds read their own writes there.
+    """
+    if not settings.BOOKING_READ_REPLICAS or PRIMARY_COOKIE in request.COOKIES:
+        return None
+    return pick_replica()
+
+
+def _bound_stream(content, alias):
+    """
+    Sends the reads made while producing each chunk of a sync stream to the replica.
+    """
+    iterator = iter(content)
+    try:
+        while True:
+            with reading_from(alias):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+
+
+async def _abound_stream(content, alias):
+    """
+    Sends the reads made while producing each chunk of an async stream to the replica.
+    """
+    iterator = aiter(content)
+    try:
+        while True:
+            with reading_from(alias):
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    return
+            yield chunk
+    finally:
+        if hasattr(iterator, 'aclose'):
+            await iterator.aclose()
+
+
+def bind_stream(response, alias):
+    """
+    Keeps a streaming response reading from the replica while its content is produced,
+    after the view has returned.
+    """
+    if response.streaming:
+        bind = _abound_stream if response.is_async else _bound_stream
+        response.streaming_content = bind(response.streaming_content, alias)
+    return response
+
+
+def reads_from_replica(view):
+    """
+    Serves a read-only view from a replica chosen by choose_replica. When the replica breaks
+    during the request, it is left out and the view runs again on the primary.
+    Works on sync and async views.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = await sync_to_async(choose_replica)(request)
+            if alias is None:
+                return await view(request, *args, **kwargs)
+            try:
+                with reading_from(alias):
+                    response = await view(request, *args, **kwargs)
+            except DatabaseError:
+                if not await sync_to_async(replica_failed)(alias):
+                    raise
+                mark_unavailable(alias)
+                return await view(request, *args, **kwargs)
+            return bind_stream(response, alias)
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = choose_replica(request)
+        if alias is None:
+            return view(request, *args, **kwargs)
+        try:
+            with reading_from(alias):
+                response = view(request, *args, **kwargs)
+        except DatabaseError:
+            if not replica_failed(alias):
+                raise
+            mark_unavailable(alias)
+            return view(request, *args, **kwargs)
+        return bind_stream(response, alias)
+
+    return wrapper
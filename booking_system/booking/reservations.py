@@ -0,0 +1,82 @@
+from collections import Counter
+
+from django.db import transaction
+
+from booking.availability import invalidate_occupancy
+from booking.conditional import bookings_changed
+from booking.events import slots_changed
+from booking.jobs import enqueue_qr_job, enqueue_qr_jobs
+from booking.models import Booking, SlotOccupancy, SlotTakenError
+from booking.qr import initial_qr_status
+
+
+def reserve_booking(serializer):
+    """
+    Atomically reserves the slot, inserts the booking and queues its QR code job.
+    Saving the booking takes its place with a conditional increment of the slot counter,
+    so concurrent requests can never overfill a slot: the losing request raises SlotTakenError.
+    """
+    with transaction.atomic():
+        booking = serializer.save(qr_status=initial_qr_status())
+        enqueue_qr_job(booking)
+        return booking
+
+
+def find_conflicts(candidates):
+    """
+    Finds the candidates that do not fit into their slot next to the existing bookings and
+    the earlier candidates. Candidates are (key, resource, start_time) triples; returns a
+    {key: error message} mapping. The slot counters around the batch are read with a single
+    range query, then the candidates are counted against the capacity of their resource.
+    """
+    if not candidates:
+        return {}
+
+    start_times = [start_time for _, _, start_time in candidates]
+    booked = {
+        (resource_id, start_time): count
+        for resource_id, start_time, count in SlotOccupancy.objects.filter(
+            resource_id__in={resource.pk for _, resource, _ in candidates},
+            start_time__gte=min(start_times), start_time__lte=max(start_times),
+        ).values_list('resource_id', 'start_time', 'booked')
+    }
+
+    conflicts = {}
+    accepted = {}
+    for key, resource, start_time in sorted(candidates, key=lambda candidate: candidate[2]):
+        slot = (resource.pk, start_time)
+        if booked.get(slot, 0) >= resource.capacity:
+            conflicts[key] = 'A booking already exists for the selected time slot.'
+        elif booked.get(slot, 0) + len(accepted.get(slot, [])) >= resource.capacity:
+            conflicts[key] = f'Overlaps item {accepted[slot][-1]} in this batch.'
+        else:
+            accepted.setdefault(slot, []).append(key)
+    return conflicts
+
+
+def reserve_bookings(validated_items, batch_size=1000):
+    """
+    Inserts many bookings and their QR code jobs in one transaction with bulk inserts.
+    The items must already fit into their slots (see find_conflicts); if concurrent requests
+    filled one of the slots in the meantime, nothing is inserted and SlotTakenError is raised.
+    Bulk inserts bypass Booking.save() and the save signals, so the slot counters are taken
+    in bulk, the affected day calendars and the list validator are dropped and the slot events
+    are published explicitly.
+    """
+    qr_status = initial_qr_status()
+    bookings = [Booking(**validated_data, qr_status=qr_status) for validated_data in validated_items]
+    try:
+        with transaction.atomic():
+            SlotOccupancy.objects.occupy_many(Counter((booking.resource_id, booking.start_time) for booking in bookings))
+            Booking.objects.bulk_create(bookings, batch_size=batch_size)
+            enqueue_qr_jobs(bookings, batch_size=batch_size)
+            days = {(booking.resource_id, booking.start_time.date()): booking for booking in bookings}
+            for booking in days.values():
+                transaction.on_commit(
+                    lambda booking=booking: invalidate_occupancy(booking.resource_id, booking.start_time)
+                )
+            bookings_changed([])
+            slots_changed(taken=[(booking.resource_id, booking.start_time) for booking in bookings])
+    except SlotTakenError as exc:
+        raise SlotTakenError('One of the selected time slots was booked concurrently; retry the batch.') from exc
+    return bookings
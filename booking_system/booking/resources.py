@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from booking.models import Resource
+
+
+def resource_cache_key(resource_id):
+    """
+    Returns the cache key holding a resource (resource_id None stands for the default resource).
+    """
+    return f"booking:resource:{resource_id or 'default'}"
+
+
+def get_resource(resource_id=None):
+    """
+    Returns the resource with the given ID, or the default resource, served from the cache.
+    The default resource is created on first use. Raises Resource.DoesNotExist for unknown IDs.
+    """
+    key = resource_cache_key(resource_id)
+    resource = cache.get(key)
+    if resource is None:
+        if resource_id:
+            resource = Resource.objects.get(pk=resource_id)
+        else:
+            resource, _ = Resource.objects.get_or_create(name=settings.BOOKING_DEFAULT_RESOURCE)
+        cache.set(key, resource, timeout=settings.BOOKING_AVAILABILITY_CACHE_TIMEOUT)
+    return resource
+
+
+def invalidate_resource(resource_id):
+    """
+    Drops a cached resource, and the cached default resource which may be the same one.
+    """
+    cache.delete_many([resource_cache_key(resource_id), resource_cache_key(None)])
@@ -1,7 +1,32 @@
+import json
+
 from rest_framework import serializers
-from booking.models import Booking
+from booking.models import Booking, Resource
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+
+from booking.qr import qr_on_demand, qr_version
+from booking.slots import is_slot_boundary
+
+
+class ResourceField(serializers.PrimaryKeyRelatedField):
+    """
+    Resource given by its ID. When the serializer context carries a `resources` mapping
+    of all resources, it is used instead of a query per value (e.g. for bulk requests).
+    """
+
+    def to_internal_value(self, data):
+        resources = self.context.get('resources')
+        if resources is None:
+            return super().to_internal_value(data)
+        try:
+            return resources[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -27,6 +52,9 @@ class BookingSerializer(serializers.ModelSerializer):
         }
     )
 
+    # Resource the booking is made on; the default resource when omitted
+    resource = ResourceField(queryset=Resource.objects.all(), required=False)
+
     # Start time field with specific format requirements and custom error messages
     start_time = serializers.DateTimeField(
         format="%Y-%m-%d %H:%M",  # Output format
@@ -44,8 +72,8 @@ class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         # Define the model and fields to include in the serialized output
         model = Booking
-        fields = ['id', 'name', 'civil_id', 'start_time', 'end_time', 'qr_code', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'name', 'civil_id', 'resource', 'start_time', 'end_time', 'qr_code', 'qr_status', 'created_at', 'updated_at']
+        read_only_fields = ['qr_code', 'qr_status', 'created_at', 'updated_at']
 
     def validate_start_time(self, value):
         """
@@ -63,6 +91,11 @@ class BookingSerializer(serializers.ModelSerializer):
         if not (settings.BOOKING_STARTING_WINDOW_TIME <= value.hour < settings.BOOKING_ENDING_WINDOW_TIME):
             raise serializers.ValidationError("Bookings can only be made between 9:00 AM and 4:00 PM.")
 
+        # Slots are fixed-length, so a booking has to start exactly on a slot boundary
+        if not is_slot_boundary(value):
+            raise serializers.ValidationError(
+                f"Bookings must start on a slot boundary (every {settings.BOOKING_DURATION} minutes).")
+
         return value
 
     def get_end_time(self, obj):
@@ -73,3 +106,83 @@ class BookingSerializer(serializers.ModelSerializer):
         duration_minutes = settings.BOOKING_DURATION
         end_time = obj.start_time + timedelta(minutes=duration_minutes)
         return end_time.strftime("%Y-%m-%d %H:%M")
+
+
+# Columns read by the fast output path, in the order BookingSerializer emits them
+BOOKING_ROW_FIELDS = ('id', 'name', 'civil_id', 'resource_id', 'start_time', 'qr_code', 'qr_status', 'created_at', 'updated_at')
+
+# Shared encoder; the stdlib C encoder produces exactly the bytes JsonResponse would
+_json_encoder = json.JSONEncoder()
+
+
+def booking_rows(queryset):
+    """
+    Returns the queryset as lightweight named tuples holding only the columns the output needs.
+    """
+    return queryset.values_list(*BOOKING_ROW_FIELDS, named=True)
+
+
+def booking_row(booking):
+    """
+    Builds the row tuple of an already loaded Booking instance.
+    """
+    return tuple(
+        getattr(booking, field).name if field == 'qr_code' else getattr(booking, field)
+        for field in BOOKING_ROW_FIELDS
+    )
+
+
+def booking_representer():
+    """
+    Returns a function turning a booking row into the dictionary BookingSerializer would produce.
+    The read path of BookingSerializer builds fields and method lookups per row; this resolves
+    the time zone, slot duration and media URL builder once and then only formats values.
+    """
+    current_timezone = django_timezone.get_current_timezone()
+    duration = timedelta(minutes=settings.BOOKING_DURATION)
+    qr_code_url = Booking._meta.get_field('qr_code').storage.url
+    on_demand = qr_on_demand()
+    if on_demand:
+        # Endpoint URLs only differ in the ID, so the route is resolved once
+        qr_url_prefix, qr_url_suffix = reverse('booking:booking_qr', args=[0]).rsplit('0', 1)
+
+    def iso_8601(value):
+        value = value.astimezone(current_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def represent(row):
+        booking_id, name, civil_id, resource_id, start_time, qr_code, qr_status, created_at, updated_at = row
+        if on_demand:
+            # The version parameter changes with the booking, so clients may cache each URL for good
+            qr_code = f'{qr_url_prefix}{booking_id}{qr_url_suffix}?v={qr_version(updated_at)}'
+        elif qr_code:
+            qr_code = qr_code_url(qr_code)
+        return {
+            'id': booking_id,
+            'name': name,
+            'civil_id': str(civil_id),
+            'resource': resource_id,
+            'start_time': start_time.astimezone(current_timezone).strftime("%Y-%m-%d %H:%M"),
+            'end_time': (start_time + duration).strftime("%Y-%m-%d %H:%M"),
+            'qr_code': qr_code or None,
+            'qr_status': qr_status,
+            'created_at': iso_8601(created_at),
+            'updated_at': iso_8601(updated_at),
+        }
+
+    return represent
+
+
+def represent_bookings(rows):
+    """
+    Represents many booking rows at once.
+    """
+    represent = booking_representer()
+    return [represent(row) for row in rows]
+
+
+def encode_json(data):
+    """
+    Encodes response data to JSON bytes, byte-for-byte identical to JsonResponse's output.
+    """
+    return _json_encoder.encode(data).encode()
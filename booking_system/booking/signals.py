@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from booking.availability import invalidate_occupancy, refresh_occupancy, update_occupancy
+from booking.conditional import bookings_changed
+from booking.events import slots_changed
+from booking.models import Booking, Resource, SlotOccupancy
+from booking.resources import invalidate_resource
+from booking.tickets import invalidate_ticket
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keeps cached booking data in step with saved bookings once the transaction commits.
+    A new booking updates one bit of its day calendar; an edited booking drops its cached
+    ticket, and its day calendar too when the slot may have moved.
+    Every save also drops the conditional GET validators of the booking and the list.
+    """
+    bookings_changed([instance.id])
+
+    if not created:
+        booking_id = instance.id
+        transaction.on_commit(lambda: invalidate_ticket(booking_id))
+
+    if update_fields is not None and not {'start_time', 'resource'} & set(update_fields):
+        # Saves that leave the slot alone cannot change the calendar
+        return
+
+    resource_id, start_time = instance.resource_id, instance.start_time
+    if created:
+        transaction.on_commit(lambda: refresh_occupancy(resource_id, start_time))
+    else:
+        transaction.on_commit(lambda: invalidate_occupancy(resource_id, start_time))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    """
+    Gives the place of a deleted booking back to its slot counter, in the deleting transaction,
+    frees the slot in the cached day calendar and drops the ticket and validators.
+    The live event streams are told that the slot was freed.
+    """
+    bookings_changed([instance.id])
+    resource_id, start_time = instance.resource_id, instance.start_time
+    booking_id = instance.id
+    SlotOccupancy.objects.release(resource_id, start_time)
+    slots_changed(freed=[(resource_id, start_time)])
+    transaction.on_commit(lambda: update_occupancy(resource_id, start_time, taken=False))
+    transaction.on_commit(lambda: invalidate_ticket(booking_id))
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def resource_changed(sender, instance, **kwargs):
+    """
+    Drops the cached copy of a changed resource. Cached day calendars pick up a new
+    capacity when they expire (BOOKING_AVAILABILITY_CACHE_TIMEOUT).
+    """
+    resource_id = instance.id
+    transaction.on_commit(lambda: invalidate_resource(resource_id))
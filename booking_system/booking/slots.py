@@ -0,0 +1,32 @@
+from datetime import datetime, time, timedelta, timezone
+
+from django.conf import settings
+
+
+def slot_duration():
+    """
+    Returns the length of a single booking slot as a timedelta.
+    """
+    return timedelta(minutes=settings.BOOKING_DURATION)
+
+
+def is_slot_boundary(value):
+    """
+    Checks whether a datetime falls exactly on the slot grid.
+    Slots start at BOOKING_STARTING_WINDOW_TIME and repeat every BOOKING_DURATION minutes,
+    so aligned start times can never overlap and the start time itself acts as the slot key.
+    """
+    if value.second or value.microsecond:
+        return False
+
+    minutes_into_window = (value.hour - settings.BOOKING_STARTING_WINDOW_TIME) * 60 + value.minute
+    return minutes_into_window % settings.BOOKING_DURATION == 0
+
+
+def day_range(first_day, last_day):
+    """
+    Returns the half-open [start, end) UTC datetime range covering the days first_day to last_day inclusive.
+    """
+    range_start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+    range_end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    return range_start, range_end
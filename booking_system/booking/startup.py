@@ -0,0 +1,26 @@
+import gc
+import io
+
+from django.urls import get_resolver
+
+
+def preload():
+    """
+    Warms the process a pre-fork server (e.g. gunicorn --preload) forks its workers from,
+    so every worker starts with the views and rendering libraries loaded and shares their
+    memory pages with the parent instead of importing them again.
+    Opens no database connections and starts no threads, as neither would survive the fork.
+    """
+    # The rendering libraries the QR and ticket code import on first use, with the fonts and PNG codec they load
+    import qrcode
+    from reportlab.pdfgen import canvas
+
+    qrcode.make('preload').save(io.BytesIO(), format='PNG')
+    canvas.Canvas(io.BytesIO()).drawString(0, 0, 'preload')
+
+    # Resolving the URLconf imports every view module
+    get_resolver().url_patterns
+
+    # Keep the garbage collector in the workers away from everything loaded so far;
+    # collections would otherwise write to these objects and copy their pages
+    gc.freeze()
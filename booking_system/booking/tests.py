@@ -1,3 +1,1362 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import datetime, time, timedelta, timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from prometheus_client import REGISTRY
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import JsonResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from booking.admission import enter, inflight_key, leave
+from booking.archive import archive_bookings
+from booking.events import LocalBroadcaster, set_broadcaster
+from booking.jobs import process_qr_jobs
+from booking.openapi import forget_schema_artifacts
+from booking.models import ArchivedBooking, Booking, IdempotencyKey, QrJob, Resource, SlotOccupancy, SlotTakenError
+from booking.replicas import PRIMARY_COOKIE, _unavailable
+from booking.resources import get_resource
+from booking.serializers import (
+    BookingSerializer, booking_representer, booking_row, booking_rows, encode_json, represent_bookings
+)
+from booking.tickets import shutdown_export_pool, ticket_cache
+from booking.views import list_querysets
+
+# Keep files written by the views (QR codes) out of the real media directory
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def future_slot(days=1, hour=10):
+    """
+    Returns an aligned slot start time a number of days in the future.
+    """
+    day = datetime.now(tz=timezone.utc).date() + timedelta(days=days)
+    return datetime.combine(day, time(hour), tzinfo=timezone.utc)
+
+
+def booking_payload(start_time, name='Sara Khalil', civil_id='982787287287'):
+    """
+    Builds a request body for the create endpoint.
+    """
+    return {'name': name, 'civil_id': civil_id, 'start_time': start_time.strftime('%Y-%m-%d %H:%M')}
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CreateBookingTests(TestCase):
+    """
+    Tests for slot reservation in the create endpoint.
+    """
+
+    def test_rejects_taken_slot(self):
+        start_time = future_slot()
+        Booking.objects.create(name='Existing', civil_id=123456789012, start_time=start_time)
+
+        response = self.client.post(reverse('booking:create_booking'), booking_payload(start_time))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'A booking already exists for the selected time slot.'})
+
+    def test_returns_before_qr_code_is_generated(self):
+        response = self.client.post(reverse('booking:create_booking'), booking_payload(future_slot()))
+
+        booking = response.json()['booking']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(booking['qr_status'], 'pending')
+        self.assertIsNone(booking['qr_code'])
+        self.assertTrue(QrJob.objects.filter(booking_id=booking['id'], status=QrJob.Status.PENDING).exists())
+
+    def test_rejects_start_time_off_the_slot_grid(self):
+        start_time = future_slot() + timedelta(minutes=30)
+
+        response = self.client.post(reverse('booking:create_booking'), booking_payload(start_time))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_time', response.json())
+
+    def test_admission_check_uses_slot_counter_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The plan format is specific to SQLite.')
+        plan = SlotOccupancy.objects.filter(resource_id=1, start_time=future_slot()).explain()
+
+        self.assertIn('USING INDEX', plan)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_QR_WORKERS=0)
+class ConcurrentCreateBookingTests(TransactionTestCase):
+    """
+    Tests that concurrent requests for the same slot produce exactly one booking.
+    """
+
+    def setUp(self):
+        # Each test starts from a flushed database, so resources cached by earlier tests are gone
+        cache.clear()
+
+    def test_concurrent_requests_book_slot_once(self):
+        start_time = future_slot(days=2)
+        barrier = threading.Barrier(5)
+        status_codes = []
+
+        def post_booking():
+            barrier.wait()
+            try:
+                response = self.client_class().post(
+                    reverse('booking:create_booking'), booking_payload(start_time))
+                status_codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post_booking) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(status_codes), [200, 400, 400, 400, 400])
+        self.assertEqual(Booking.objects.filter(start_time=start_time).count(), 1)
+
+    def test_concurrent_duplicates_run_once(self):
+        start_time = future_slot(days=3)
+        barrier = threading.Barrier(5)
+        bodies = []
+
+        def post_booking():
+            barrier.wait()
+            try:
+                response = self.client_class().post(
+                    reverse('booking:create_booking'), booking_payload(start_time), HTTP_IDEMPOTENCY_KEY='retry-1')
+                bodies.append((response.status_code, response.content))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post_booking) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(bodies)), 1)
+        self.assertEqual(bodies[0][0], 200)
+        self.assertEqual(Booking.objects.filter(start_time=start_time).count(), 1)
+
+
+class ListBookingsTests(TestCase):
+    """
+    Tests for keyset pagination and streaming in the list endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for hour in range(9, 16):
+            Booking.objects.create(name=f'Guest {hour}', civil_id=123456789012, start_time=future_slot(hour=hour))
+
+    def test_pages_follow_cursor_in_start_time_order(self):
+        names = []
+        params = {'limit': 3}
+        while True:
+            body = self.client.get(reverse('booking:get_all_bookings'), params).json()
+            names += [booking['name'] for booking in body['bookings']]
+            if not body['next_cursor']:
+                break
+            params['cursor'] = body['next_cursor']
+
+        self.assertEqual(names, [f'Guest {hour}' for hour in range(9, 16)])
+
+    def test_rejects_invalid_cursor(self):
+        response = self.client.get(reverse('booking:get_all_bookings'), {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_cursor_with_naive_or_non_utc_time(self):
+        for start_time in ('2030-01-01T10:00:00', '2030-01-01T10:00:00+03:00'):
+            cursor = base64.urlsafe_b64encode(f'{start_time}|1'.encode()).decode()
+            response = self.client.get(reverse('booking:get_all_bookings'), {'cursor': cursor, 'from': '2030-01-01'})
+
+            self.assertEqual(response.status_code, 400)
+
+    def test_ndjson_stream_contains_every_booking(self):
+        response = self.client.get(reverse('booking:get_all_bookings'), {'stream': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 7)
+
+    def test_json_stream_matches_page_payload(self):
+        response = self.client.get(reverse('booking:get_all_bookings'), {'stream': 'json'})
+        streamed = json.loads(b''.join(response.streaming_content))
+        page = self.client.get(reverse('booking:get_all_bookings')).json()
+
+        self.assertEqual(streamed['bookings'], page['bookings'])
+
+    def test_filters_by_civil_id_name_prefix_and_day(self):
+        Booking.objects.create(name='sara Khalil', civil_id=982787287287, start_time=future_slot(days=2))
+        Booking.objects.create(name='Salem', civil_id=982787287287, start_time=future_slot(days=3))
+        url = reverse('booking:get_all_bookings')
+
+        def names(**params):
+            return [booking['name'] for booking in self.client.get(url, params).json()['bookings']]
+
+        tomorrow = future_slot(days=2).date().isoformat()
+        self.assertEqual(names(civil_id=982787287287), ['sara Khalil', 'Salem'])
+        self.assertEqual(names(name='SAR'), ['sara Khalil'])
+        self.assertEqual(names(civil_id=982787287287, **{'from': tomorrow, 'to': tomorrow}), ['sara Khalil'])
+        self.assertEqual(self.client.get(url, {'civil_id': 'abc'}).status_code, 400)
+
+    def test_filters_by_non_ascii_name_prefix(self):
+        Booking.objects.create(name='Émile Zola', civil_id=982787287287, start_time=future_slot(days=2))
+        Booking.objects.create(name='Eman', civil_id=982787287287, start_time=future_slot(days=3))
+        url = reverse('booking:get_all_bookings')
+
+        def names(**params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            return [booking['name'] for booking in response.json()['bookings']]
+
+        self.assertEqual(names(name='Émi'), ['Émile Zola'])
+        self.assertEqual(names(name='\U0010ffff'), [])
+        self.assertEqual(names(name='e'), ['Eman'])
+
+    def test_name_prefix_matches_only_names_starting_with_it(self):
+        for hour, name in enumerate(('Sam', 'S-am', 'SAM-2', 'sb', 'S_m', 'S%m'), 9):
+            Booking.objects.create(name=name, civil_id=982787287287, start_time=future_slot(days=2, hour=hour))
+        url = reverse('booking:get_all_bookings')
+
+        def names(prefix):
+            return sorted(booking['name'] for booking in self.client.get(url, {'name': prefix}).json()['bookings'])
+
+        self.assertEqual(names('sa'), ['SAM-2', 'Sam'])
+        self.assertEqual(names('s-'), ['S-am'])
+        self.assertEqual(names('s_'), ['S_m'])
+        self.assertEqual(names('s%'), ['S%m'])
+
+    def test_name_prefix_seeks_the_pattern_index_on_postgresql(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('The pattern index exists on PostgreSQL only.')
+        with connection.cursor() as cursor:
+            # The test table is tiny, so the planner would rather scan it
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        self.assertIn('booking_name_pattern_idx', list_querysets({'name': 'sa'})[0].explain())
+
+    def test_lookups_seek_their_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The plan format is specific to SQLite.')
+
+        def plan(**params):
+            return list_querysets(params)[0].order_by('start_time', 'id').explain()
+
+        self.assertIn('USING INDEX booking_civil_id_idx (civil_id=?)', plan(civil_id='982787287287'))
+        self.assertIn('USING INDEX booking_name_prefix_idx', plan(name='sa'))
+        self.assertIn('USING INDEX booking_start_idx (start_time>? AND start_time<?)', plan(**{'from': '2030-01-01', 'to': '2030-01-02'}))
+
+
+class AvailabilityTests(TestCase):
+    """
+    Tests for the slot availability endpoint and its cached day calendars.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def get_day(self, day):
+        response = self.client.get(reverse('booking:get_availability'), {'from': day.isoformat(), 'to': day.isoformat()})
+        return response.json()['days'][0]
+
+    def test_marks_booked_slot_as_taken(self):
+        start_time = future_slot(hour=11)
+        Booking.objects.create(name='Guest', civil_id=123456789012, start_time=start_time)
+
+        slots = self.get_day(start_time.date())['slots']
+
+        self.assertEqual(len(slots), 7)
+        self.assertEqual([slot['start_time'][-5:] for slot in slots if not slot['available']], ['11:00'])
+
+    def test_cached_calendar_is_served_without_queries_and_updated_on_create(self):
+        start_time = future_slot(hour=12)
+        self.get_day(start_time.date())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(name='Guest', civil_id=123456789012, start_time=start_time)
+        with self.assertNumQueries(0):
+            slots = self.get_day(start_time.date())['slots']
+
+        self.assertFalse(slots[3]['available'])
+
+    def test_calendar_read_racing_a_booking_is_not_kept(self):
+        start_time = future_slot(hour=13)
+        set_many = cache.set_many
+
+        def booked_before_the_calendar_is_filed(*args, **kwargs):
+            # The booking commits after the calendar was read from the database
+            with self.captureOnCommitCallbacks(execute=True):
+                Booking.objects.create(name='Guest', civil_id=123456789012, start_time=start_time)
+            set_many(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set_many', side_effect=booked_before_the_calendar_is_filed):
+            stale = self.get_day(start_time.date())['slots']
+        fresh = self.get_day(start_time.date())['slots']
+
+        self.assertTrue(stale[4]['available'])
+        self.assertFalse(fresh[4]['available'])
+
+    def test_rejects_reversed_range(self):
+        response = self.client.get(reverse('booking:get_availability'), {'from': '2030-01-02', 'to': '2030-01-01'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_QR_MAX_ATTEMPTS=2)
+class QrJobTests(TestCase):
+    """
+    Tests for the background QR code pipeline.
+    """
+
+    def setUp(self):
+        self.booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+        QrJob.objects.create(booking=self.booking)
+
+    def test_worker_renders_queued_qr_codes(self):
+        self.assertEqual(process_qr_jobs(), 1)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.qr_status, Booking.QrStatus.READY)
+        self.assertTrue(self.booking.qr_code.read(8).startswith(b'\x89PNG'))
+        self.assertEqual(self.booking.qr_job.status, QrJob.Status.DONE)
+
+    def test_failed_jobs_are_retried_then_marked_failed(self):
+        with mock.patch('booking.jobs.render_qr_png', side_effect=RuntimeError('boom')), \
+                self.assertLogs('booking.jobs', 'ERROR'):
+            process_qr_jobs()
+            QrJob.objects.update(run_after=datetime.now(tz=timezone.utc))
+            process_qr_jobs()
+
+        job = QrJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (QrJob.Status.FAILED, 2, 'boom'))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.qr_status, Booking.QrStatus.FAILED)
+
+    def test_backfill_queues_bookings_without_qr_code(self):
+        QrJob.objects.update(status=QrJob.Status.FAILED)
+        other = Booking.objects.create(name='Imported', civil_id=123456789012, start_time=future_slot(hour=11))
+
+        call_command('backfill_qr_codes', stdout=io.StringIO())
+
+        self.assertEqual(QrJob.objects.filter(status=QrJob.Status.PENDING).count(), 2)
+        self.assertTrue(QrJob.objects.filter(booking=other).exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class BookingPdfTests(TestCase):
+    """
+    Tests for the PDF ticket endpoint and its rendered-ticket cache.
+    """
+
+    def setUp(self):
+        ticket_cache().clear()
+        self.booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+    def get_pdf(self):
+        return self.client.get(reverse('booking:generate_booking_pdf'), {'booking_id': self.booking.id})
+
+    def test_repeat_download_is_served_from_cache(self):
+        first = self.get_pdf()
+        with mock.patch('booking.tickets.render_ticket_pdf') as render:
+            second = self.get_pdf()
+
+        render.assert_not_called()
+        self.assertEqual(first['X-Ticket-Cache'], 'MISS')
+        self.assertEqual(second['X-Ticket-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(second.content.startswith(b'%PDF'))
+
+    @override_settings(BOOKING_QR_MODE='on_demand')
+    def test_ticket_without_drawable_qr_code_is_issued_and_logged(self):
+        with mock.patch('booking.qr.get_qr_png', side_effect=ValueError('bad image')), \
+                self.assertLogs('booking.tickets', 'ERROR') as logs:
+            response = self.get_pdf()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertIn(f'booking {self.booking.id}', logs.output[0])
+
+    def test_saving_booking_invalidates_cached_ticket(self):
+        self.get_pdf()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.name = 'Renamed'
+            self.booking.save()
+
+        self.assertEqual(self.get_pdf()['X-Ticket-Cache'], 'MISS')
+
+    def test_missing_booking_returns_404(self):
+        response = self.client.get(reverse('booking:generate_booking_pdf'), {'booking_id': 999})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ConditionalGetTests(TestCase):
+    """
+    Tests for ETag / Last-Modified validation of the list and PDF endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        ticket_cache().clear()
+        self.booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+    def test_unchanged_list_is_answered_with_304_without_queries(self):
+        first = self.client.get(reverse('booking:get_all_bookings'))
+
+        with self.assertNumQueries(0), mock.patch('booking.views.represent_bookings') as represent:
+            second = self.client.get(reverse('booking:get_all_bookings'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        represent.assert_not_called()
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertNotIn('Last-Modified', first)
+
+    def test_list_etag_changes_with_writes_that_keep_the_totals(self):
+        Booking.objects.filter(pk=self.booking.pk).update(start_time=future_slot(days=-60))
+        first = self.client.get(reverse('booking:get_all_bookings'))
+
+        # Archiving moves a booking without changing the count or the latest updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_bookings', stdout=io.StringIO())
+        second = self.client.get(reverse('booking:get_all_bookings'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_list_is_not_validated_by_date_alone(self):
+        first = self.client.get(reverse('booking:get_all_bookings'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.delete()
+
+        by_date = self.client.get(
+            reverse('booking:get_all_bookings'), HTTP_IF_MODIFIED_SINCE=http_date((datetime.now(timezone.utc) + timedelta(minutes=1)).timestamp())
+        )
+        by_etag = self.client.get(reverse('booking:get_all_bookings'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(by_date.status_code, 200)
+        self.assertEqual(by_date.json()['bookings'], [])
+        self.assertEqual(by_etag.status_code, 200)
+
+    def test_list_etag_changes_with_bookings_and_query_string(self):
+        first = self.client.get(reverse('booking:get_all_bookings'))
+        other_page = self.client.get(reverse('booking:get_all_bookings'), {'limit': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking:bulk_create_bookings'), [booking_payload(future_slot(hour=11))],
+                             content_type='application/json')
+        after_create = self.client.get(reverse('booking:get_all_bookings'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertNotEqual(other_page['ETag'], first['ETag'])
+        self.assertEqual(after_create.status_code, 200)
+        self.assertEqual(len(after_create.json()['bookings']), 2)
+
+    def test_unchanged_ticket_is_answered_with_304_without_rendering(self):
+        url = reverse('booking:generate_booking_pdf')
+        first = self.client.get(url, {'booking_id': self.booking.id})
+
+        with self.assertNumQueries(0), mock.patch('booking.tickets.render_ticket_pdf') as render:
+            second = self.client.get(url, {'booking_id': self.booking.id}, HTTP_IF_NONE_MATCH=first['ETag'])
+            by_date = self.client.get(url, {'booking_id': self.booking.id}, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        render.assert_not_called()
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_changed_ticket_is_rendered_again(self):
+        url = reverse('booking:generate_booking_pdf')
+        first = self.client.get(url, {'booking_id': self.booking.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.name = 'Renamed'
+            self.booking.save()
+
+        second = self.client.get(url, {'booking_id': self.booking.id}, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_TICKET_EXPORT_WORKERS=0)
+class ExportBookingPdfsTests(TestCase):
+    """
+    Tests for the bulk ticket export endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bookings = [
+            Booking.objects.create(name=f'Guest {hour}', civil_id=123456789012, start_time=future_slot(hour=hour))
+            for hour in (9, 10, 11)
+        ]
+
+    def test_zip_export_contains_one_pdf_per_booking(self):
+        ids = ','.join(str(booking.id) for booking in self.bookings[:2])
+        response = self.client.get(reverse('booking:export_booking_pdfs'), {'ids': ids, 'output': 'zip'})
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'Booking_{booking.id}.pdf' for booking in self.bookings[:2]])
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+    @override_settings(BOOKING_TICKET_EXPORT_WORKERS=1)
+    def test_zip_export_renders_in_worker_processes(self):
+        self.addCleanup(shutdown_export_pool)
+        ids = ','.join(str(booking.id) for booking in self.bookings)
+        response = self.client.get(reverse('booking:export_booking_pdfs'), {'ids': ids, 'output': 'zip'})
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'Booking_{booking.id}.pdf' for booking in self.bookings])
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in archive.namelist()))
+
+    def test_date_range_export_renders_one_page_per_booking(self):
+        day = self.bookings[0].start_time.date().isoformat()
+        response = self.client.get(reverse('booking:export_booking_pdfs'), {'from': day, 'to': day})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content.count(b'/Type /Page\n'), 3)
+
+    @override_settings(BOOKING_TICKET_EXPORT_MAX=2)
+    def test_rejects_oversized_export(self):
+        day = self.bookings[0].start_time.date().isoformat()
+        response = self.client.get(reverse('booking:export_booking_pdfs'), {'from': day, 'to': day})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkCreateBookingsTests(TestCase):
+    """
+    Tests for the bulk create endpoint.
+    """
+
+    def post_items(self, items):
+        return self.client.post(reverse('booking:bulk_create_bookings'), items, content_type='application/json')
+
+    def test_creates_valid_items_and_reports_each_failure(self):
+        Booking.objects.create(name='Existing', civil_id=123456789012, start_time=future_slot(hour=9))
+        items = [
+            booking_payload(future_slot(hour=10)),
+            booking_payload(future_slot(hour=9)),
+            booking_payload(future_slot(hour=11)),
+            booking_payload(future_slot(hour=11)),
+            {'name': 'No civil id', 'start_time': '2030-01-01 10:00'},
+        ]
+
+        body = self.post_items(items).json()
+
+        self.assertEqual((body['created'], body['failed']), (2, 3))
+        self.assertEqual([result['status'] for result in body['results']],
+                         ['created', 'error', 'created', 'error', 'error'])
+        self.assertEqual(body['results'][3]['errors'], {'start_time': ['Overlaps item 2 in this batch.']})
+        self.assertIn('civil_id', body['results'][4]['errors'])
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(QrJob.objects.count(), 2)
+
+    def test_detects_conflicts_with_one_query_for_the_batch(self):
+        items = [booking_payload(future_slot(days=day, hour=hour)) for day in (1, 2) for hour in range(9, 16)]
+
+        get_resource()
+
+        # One resource read, one conflict read, and in the transaction the capacity and counter reads,
+        # the counter insert in its savepoint, and the bulk inserts for bookings and jobs; none of them
+        # grows with the batch
+        with self.assertNumQueries(11):
+            body = self.post_items(items).json()
+
+        self.assertEqual(body['created'], 14)
+
+    def test_rejects_non_list_body(self):
+        self.assertEqual(self.post_items({'name': 'Guest'}).status_code, 400)
+
+
+class FastBookingOutputTests(TestCase):
+    """
+    Tests that the fast read path produces exactly the output of BookingSerializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Booking.objects.create(name='Sara Khalil', civil_id=982787287287, start_time=future_slot(hour=9))
+        Booking.objects.create(
+            name='Zoë "Quoted" Ünïcode', civil_id=123456789012, start_time=future_slot(hour=10),
+            qr_code='qr_codes/qr_Zoë Ünïcode.png', qr_status=Booking.QrStatus.READY,
+        )
+        Booking.objects.create(name='Guest', civil_id=111111111111, start_time=future_slot(days=2, hour=15))
+
+    def expected_bytes(self, data):
+        return JsonResponse(data).content
+
+    def test_rows_match_booking_serializer_byte_for_byte(self):
+        bookings = Booking.objects.order_by('start_time', 'id')
+        expected = self.expected_bytes({'bookings': BookingSerializer(bookings, many=True).data})
+
+        self.assertEqual(encode_json({'bookings': represent_bookings(booking_rows(bookings))}), expected)
+
+    def test_loaded_instance_matches_booking_serializer(self):
+        booking = Booking.objects.get(name__startswith='Zo')
+
+        self.assertEqual(booking_representer()(booking_row(booking)), BookingSerializer(booking).data)
+
+    def test_list_page_matches_booking_serializer_byte_for_byte(self):
+        bookings = Booking.objects.order_by('start_time', 'id')
+        expected = self.expected_bytes({'bookings': BookingSerializer(bookings, many=True).data, 'next_cursor': None})
+
+        self.assertEqual(self.client.get(reverse('booking:get_all_bookings')).content, expected)
+
+    def test_streamed_list_across_chunks_is_valid_json(self):
+        bookings = Booking.objects.order_by('start_time', 'id')
+        expected = self.expected_bytes({'bookings': BookingSerializer(bookings, many=True).data})
+
+        for rows_per_chunk in (1, 2, 3):
+            with mock.patch('booking.views.STREAM_ROWS_PER_CHUNK', rows_per_chunk):
+                response = self.client.get(reverse('booking:get_all_bookings'), {'stream': 'json'})
+                self.assertEqual(b''.join(response.streaming_content), expected)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AsyncViewsTests(TestCase):
+    """
+    Tests that the async endpoints keep the contract of their synchronous counterparts.
+    """
+
+    async def test_create_and_reject_taken_slot(self):
+        payload = booking_payload(future_slot())
+
+        created = await self.async_client.post(
+            reverse('booking_async:create_booking'), payload, content_type='application/json'
+        )
+        taken = await self.async_client.post(reverse('booking_async:create_booking'), payload)
+
+        self.assertEqual(created.status_code, 200)
+        self.assertEqual(created.json()['booking']['qr_status'], 'pending')
+        self.assertEqual(taken.status_code, 400)
+
+    async def test_list_matches_sync_endpoint(self):
+        for hour in (9, 10, 11):
+            await Booking.objects.acreate(name=f'Guest {hour}', civil_id=123456789012, start_time=future_slot(hour=hour))
+
+        def get_sync_content(params):
+            response = self.client.get(reverse('booking:get_all_bookings'), params)
+            return b''.join(response.streaming_content) if response.streaming else response.content
+
+        for params in ({'limit': 2}, {'stream': 'json'}, {'stream': 'ndjson'}):
+            response = await self.async_client.get(reverse('booking_async:get_all_bookings'), params)
+            if response.streaming:
+                content = b''.join([chunk async for chunk in response.streaming_content])
+            else:
+                content = response.content
+            self.assertEqual(content, await sync_to_async(get_sync_content)(params))
+
+    async def test_pdf_is_rendered_off_the_event_loop(self):
+        booking = await Booking.objects.acreate(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+        response = await self.async_client.get(reverse('booking_async:generate_booking_pdf'), {'booking_id': booking.id})
+        missing = await self.async_client.get(reverse('booking_async:generate_booking_pdf'), {'booking_id': 999})
+
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(missing.status_code, 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+class SqliteConnectionTests(TestCase):
+    """
+    Tests that SQLite connections are opened with the configured pragmas.
+    """
+
+    def test_connection_uses_wal_and_configured_pragmas(self):
+        pragmas = {}
+        with connection.cursor() as cursor:
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'mmap_size': 134217728})
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class MetricsTests(TestCase):
+    """
+    Tests for request instrumentation and the Prometheus endpoint.
+    """
+
+    @staticmethod
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_records_latency_queries_and_phases_per_route(self):
+        route = {'route': 'booking:create_booking'}
+        requests_before = self.sample(
+            'booking_http_request_duration_seconds_count', method='POST', status='200', **route
+        )
+        queries_before = self.sample('booking_http_request_db_queries_sum', **route)
+        phases_before = self.sample('booking_phase_duration_seconds_count', operation='create_booking', phase='reserve')
+
+        self.client.post(reverse('booking:create_booking'), booking_payload(future_slot()))
+
+        self.assertEqual(
+            self.sample('booking_http_request_duration_seconds_count', method='POST', status='200', **route),
+            requests_before + 1,
+        )
+        self.assertGreater(self.sample('booking_http_request_db_queries_sum', **route), queries_before)
+        self.assertEqual(
+            self.sample('booking_phase_duration_seconds_count', operation='create_booking', phase='reserve'),
+            phases_before + 1,
+        )
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        self.client.get(reverse('booking:get_all_bookings'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'booking_http_request_duration_seconds_bucket{', response.content)
+        self.assertIn(b'route="booking:get_all_bookings"', response.content)
+
+    def test_sampled_profiles_keep_only_the_slowest_requests(self):
+        profile_dir = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+        with override_settings(BOOKING_PROFILE_SAMPLE_RATE=1.0, BOOKING_PROFILE_DIR=profile_dir, BOOKING_PROFILE_KEEP=2), \
+                mock.patch('booking.middleware.slow_request_profiles._slowest', []):
+            for _ in range(4):
+                self.client.get(reverse('booking:get_all_bookings'))
+
+        profiles = os.listdir(profile_dir)
+        self.assertEqual(len(profiles), 2)
+        self.assertTrue(all('-booking-get_all_bookings-' in name for name in profiles))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    """
+    Tests for moving past bookings to the archive and reading them back.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.old = [
+            Booking.objects.create(name=f'Old {hour}', civil_id=123456789012, start_time=future_slot(days=-60, hour=hour))
+            for hour in (9, 10)
+        ]
+        self.current = Booking.objects.create(name='Current', civil_id=123456789012, start_time=future_slot())
+        QrJob.objects.create(booking=self.old[0])
+
+    def test_moves_old_bookings_in_batches_keeping_ids_and_timestamps(self):
+        call_command('archive_bookings', batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(list(Booking.objects.values_list('id', flat=True)), [self.current.id])
+        archived = ArchivedBooking.objects.get(id=self.old[0].id)
+        self.assertEqual(archived.updated_at, self.old[0].updated_at)
+        self.assertEqual(archived.created_at, self.old[0].created_at)
+        self.assertEqual(ArchivedBooking.objects.count(), 2)
+        self.assertFalse(QrJob.objects.exists())
+
+    def test_batch_boundary_keeps_the_counters_of_slots_not_yet_moved(self):
+        room = Resource.objects.create(name='Room', capacity=2)
+        start_time = future_slot(days=-60, hour=11)
+        shared = [
+            Booking.objects.create(name=f'Shared {number}', civil_id=123456789012, resource=room, start_time=start_time)
+            for number in (1, 2)
+        ]
+
+        # The first batch ends inside the shared slot, and the run stops before the second one
+        bulk_create = ArchivedBooking.objects.bulk_create
+        batches = iter([bulk_create, mock.Mock(side_effect=OperationalError('interrupted'))])
+        with mock.patch.object(ArchivedBooking.objects, 'bulk_create', side_effect=lambda objs: next(batches)(objs)):
+            with self.assertRaises(OperationalError):
+                archive_bookings(batch_size=3)
+
+        counter = SlotOccupancy.objects.filter(resource=room, start_time=start_time)
+        self.assertEqual(list(counter.values_list('booked', flat=True)), [2])
+        self.assertTrue(Booking.objects.filter(id=shared[1].id).exists())
+
+    def test_reads_include_the_archive_when_the_range_reaches_into_it(self):
+        before = self.client.get(reverse('booking:get_all_bookings')).json()
+        call_command('archive_bookings', stdout=io.StringIO())
+        cache.clear()
+
+        after = self.client.get(reverse('booking:get_all_bookings')).json()
+        pdf = self.client.get(reverse('booking:generate_booking_pdf'), {'booking_id': self.old[0].id})
+        day = self.old[0].start_time.date().isoformat()
+        slots = self.client.get(reverse('booking:get_availability'), {'from': day, 'to': day}).json()['days'][0]['slots']
+
+        self.assertEqual(after, before)
+        self.assertTrue(pdf.content.startswith(b'%PDF'))
+        self.assertEqual([slot['available'] for slot in slots[:2]], [False, False])
+
+    def test_current_ranges_skip_the_archive(self):
+        call_command('archive_bookings', stdout=io.StringIO())
+        params = {'from': future_slot().date().isoformat()}
+        # Warm the cached list validator, which totals both tables
+        self.client.get(reverse('booking:get_all_bookings'), params)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('booking:get_all_bookings'), params)
+
+        self.assertEqual([booking['id'] for booking in response.json()['bookings']], [self.current.id])
+        self.assertFalse(any('archivedbooking' in query['sql'] for query in queries.captured_queries))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ResourceCapacityTests(TestCase):
+    """
+    Tests for bookings on resources that take several bookings per slot.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.room = Resource.objects.create(name='Room', capacity=2)
+
+    def create(self, start_time):
+        payload = {**booking_payload(start_time), 'resource': self.room.id}
+        return self.client.post(reverse('booking:create_booking'), payload)
+
+    def test_slot_takes_bookings_up_to_capacity(self):
+        start_time = future_slot()
+
+        status_codes = [self.create(start_time).status_code for _ in range(3)]
+
+        self.assertEqual(status_codes, [200, 200, 400])
+        self.assertEqual(SlotOccupancy.objects.get(resource=self.room, start_time=start_time).booked, 2)
+        self.assertEqual(self.create(future_slot(hour=11)).json()['booking']['resource'], self.room.id)
+
+    def test_deleting_a_booking_frees_its_place(self):
+        start_time = future_slot()
+        self.create(start_time)
+        self.create(start_time)
+
+        Booking.objects.filter(resource=self.room).first().delete()
+
+        self.assertEqual(self.create(start_time).status_code, 200)
+
+    def test_bulk_create_counts_items_against_capacity(self):
+        items = [{**booking_payload(future_slot()), 'resource': self.room.id} for _ in range(3)]
+
+        body = self.client.post(reverse('booking:bulk_create_bookings'), items, content_type='application/json').json()
+
+        self.assertEqual(body['created'], 2)
+        self.assertEqual(body['results'][2]['errors'], {'start_time': ['Overlaps item 1 in this batch.']})
+
+    def test_availability_and_list_are_per_resource(self):
+        start_time = future_slot()
+        self.create(start_time)
+        Booking.objects.create(name='Default', civil_id=123456789012, start_time=start_time)
+        day = start_time.date().isoformat()
+
+        def slot_available():
+            response = self.client.get(
+                reverse('booking:get_availability'), {'from': day, 'to': day, 'resource': self.room.id}
+            )
+            return response.json()['days'][0]['slots'][1]['available']
+
+        available_with_one = slot_available()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(start_time)
+        listed = self.client.get(reverse('booking:get_all_bookings'), {'resource': self.room.id}).json()['bookings']
+
+        self.assertTrue(available_with_one)
+        self.assertFalse(slot_available())
+        self.assertEqual([booking['resource'] for booking in listed], [self.room.id, self.room.id])
+
+    def test_bulk_occupation_raises_existing_counters_within_capacity(self):
+        taken, free, new = future_slot(hour=9), future_slot(hour=10), future_slot(hour=11)
+        SlotOccupancy.objects.create(resource=self.room, start_time=taken, booked=2)
+        SlotOccupancy.objects.create(resource=self.room, start_time=free, booked=1)
+
+        with self.assertRaises(SlotTakenError), transaction.atomic():
+            SlotOccupancy.objects.occupy_many({(self.room.id, taken): 1, (self.room.id, new): 1})
+        with transaction.atomic():
+            SlotOccupancy.objects.occupy_many({(self.room.id, free): 1, (self.room.id, new): 2})
+
+        booked = dict(SlotOccupancy.objects.filter(resource=self.room).values_list('start_time', 'booked'))
+        self.assertEqual(booked, {taken: 2, free: 2, new: 2})
+
+    def test_new_bookings_default_to_the_cached_default_resource(self):
+        default = get_resource()
+
+        with self.assertNumQueries(0):
+            booking = Booking(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+        self.assertEqual(booking.resource_id, default.pk)
+        self.assertEqual(default.name, settings.BOOKING_DEFAULT_RESOURCE)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class IdempotencyTests(TestCase):
+    """
+    Tests for the Idempotency-Key header on the create endpoint.
+    """
+
+    def post(self, start_time, key='key-1', **payload):
+        return self.client.post(
+            reverse('booking:create_booking'), {**booking_payload(start_time), **payload}, HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_original_response(self):
+        start_time = future_slot()
+        first = self.post(start_time)
+
+        with mock.patch('booking.views.reserve_booking') as reserve:
+            retry = self.post(start_time)
+
+        reserve.assert_not_called()
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(QrJob.objects.count(), 1)
+
+    def test_rejects_key_reused_for_another_request(self):
+        start_time = future_slot()
+        self.post(start_time)
+
+        response = self.post(start_time, name='Someone Else')
+
+        self.assertEqual(response.status_code, 422)
+
+    @override_settings(BOOKING_IDEMPOTENCY_WAIT=0)
+    def test_duplicate_of_request_in_flight_gets_409(self):
+        start_time = future_slot()
+        fingerprint = 'unused'
+        with mock.patch('booking.idempotency.request_fingerprint', return_value=fingerprint):
+            IdempotencyKey.objects.create(key='key-1', fingerprint=fingerprint)
+            response = self.post(start_time)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Booking.objects.exists())
+
+    @override_settings(BOOKING_IDEMPOTENCY_WAIT=3)
+    async def test_async_duplicate_waits_for_the_original_and_replays_it(self):
+        url = reverse('booking_async:create_booking')
+        payload = booking_payload(future_slot())
+
+        responses = await asyncio.gather(*(
+            self.async_client.post(url, payload, content_type='application/json', headers={'Idempotency-Key': 'key-1'})
+            for _ in range(2)
+        ))
+
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(responses[0].content, responses[1].content)
+        self.assertEqual(sorted(response.get('Idempotent-Replayed', '') for response in responses), ['', 'true'])
+        self.assertEqual(await Booking.objects.acount(), 1)
+
+    def test_abandoned_and_expired_keys_are_taken_over(self):
+        start_time = future_slot()
+        old = datetime.now(tz=timezone.utc) - timedelta(days=2)
+        with mock.patch('booking.idempotency.request_fingerprint', return_value='same'):
+            IdempotencyKey.objects.create(key='abandoned', fingerprint='same', created_at=old)
+            IdempotencyKey.objects.create(key='expired', fingerprint='other', status_code=400, body=b'{}', created_at=old)
+
+            abandoned = self.post(start_time, key='abandoned')
+            expired = self.post(future_slot(hour=11), key='expired')
+
+        self.assertEqual((abandoned.status_code, expired.status_code), (200, 200))
+        self.assertEqual(IdempotencyKey.objects.filter(status_code=200).count(), 2)
+
+    def test_purge_command_removes_expired_keys(self):
+        IdempotencyKey.objects.create(key='old', fingerprint='x', created_at=datetime.now(tz=timezone.utc) - timedelta(days=2))
+        IdempotencyKey.objects.create(key='new', fingerprint='x')
+
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AdmissionControlTests(TestCase):
+    """
+    Tests for the concurrency limits and rate limits on the create and PDF endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def rejections(self, route, reason):
+        return REGISTRY.get_sample_value(
+            'booking_admission_rejections_total', {'route': route, 'reason': reason}
+        ) or 0
+
+    @override_settings(BOOKING_RATE_PER_CIVIL_ID=0.01, BOOKING_RATE_BURST_PER_CIVIL_ID=2)
+    def test_rate_limits_bookings_per_civil_id(self):
+        rejected_before = self.rejections('create_booking', 'rate_civil_id')
+        url = reverse('booking:create_booking')
+
+        status_codes = [self.client.post(url, booking_payload(future_slot(hour=hour))).status_code for hour in (10, 11)]
+        limited = self.client.post(url, booking_payload(future_slot(hour=12)))
+        other_person = self.client.post(url, booking_payload(future_slot(hour=12), civil_id='123456789012'))
+
+        self.assertEqual(status_codes, [200, 200])
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited['Retry-After'], '100')
+        self.assertEqual(other_person.status_code, 200)
+        self.assertEqual(self.rejections('create_booking', 'rate_civil_id'), rejected_before + 1)
+
+    @override_settings(BOOKING_PDF_MAX_CONCURRENCY=1)
+    def test_sheds_requests_over_the_concurrency_limit(self):
+        url = reverse('booking:generate_booking_pdf')
+        rejected_before = self.rejections('generate_booking_pdf', 'concurrency')
+
+        self.assertTrue(enter('generate_booking_pdf', 1))
+        busy = self.client.get(url, {'booking_id': 1})
+        leave('generate_booking_pdf')
+        admitted = self.client.get(url, {'booking_id': 1})
+
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(busy['Retry-After'], '1')
+        self.assertEqual(admitted.status_code, 404)
+        self.assertEqual(cache.get(inflight_key('generate_booking_pdf')), 0)
+        self.assertEqual(self.rejections('generate_booking_pdf', 'concurrency'), rejected_before + 1)
+
+
+class StartupTests(TestCase):
+    """
+    Tests for worker startup cost.
+    """
+
+    def test_workers_start_without_rendering_libraries(self):
+        out = io.StringIO()
+
+        call_command('profile_imports', top=1000, budget=60000, stdout=out)
+
+        packages = {line.split()[0] for line in out.getvalue().splitlines()}
+        self.assertIn('booking', packages)
+        self.assertFalse(packages & {'reportlab', 'qrcode'})
+        with self.assertRaises(CommandError):
+            call_command('profile_imports', budget=1, stdout=io.StringIO())
+
+
+class OpenApiSchemaTests(TestCase):
+    """
+    Tests for the pre-generated OpenAPI schema.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.addCleanup(forget_schema_artifacts)
+        forget_schema_artifacts()
+
+    def generate(self):
+        out = io.StringIO()
+        call_command('generate_openapi', output=self.directory, stdout=out)
+        return out.getvalue()
+
+    def test_swagger_ui_does_not_generate_the_schema(self):
+        with mock.patch('drf_yasg.generators.OpenAPISchemaGenerator.get_schema') as get_schema:
+            response = self.client.get(reverse('schema-swagger-ui'))
+
+        get_schema.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Slot Booking API')
+        self.assertContains(response, reverse('openapi-schema', kwargs={'schema_format': 'json'}))
+
+    def test_generates_versioned_artifacts_once(self):
+        first = self.generate()
+        second = self.generate()
+
+        version = first.split()[3]
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted([f'openapi-{version}.json', f'openapi-{version}.json.gz', f'openapi-{version}.yaml',
+                    f'openapi-{version}.yaml.gz', 'openapi.manifest.json'])
+        )
+        self.assertIn('is up to date', second)
+
+    def test_serves_artifacts_compressed_with_etag(self):
+        with override_settings(BOOKING_OPENAPI_DIR=self.directory):
+            self.generate()
+            with mock.patch('booking.openapi.generate_schema') as generate_schema:
+                response = self.client.get('/openapi.json', HTTP_ACCEPT_ENCODING='gzip, deflate')
+                repeated = self.client.get('/openapi.json', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+                plain = self.client.get('/openapi.yaml')
+
+        generate_schema.assert_not_called()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('/create/', json.loads(gzip.decompress(response.content))['paths'])
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(plain['Content-Type'], 'application/yaml')
+        self.assertTrue(plain.content.startswith(b"swagger: '2.0'"))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_QR_MODE='on_demand')
+class OnDemandQrTests(TestCase):
+    """
+    Tests for QR codes rendered on demand instead of stored as files.
+    """
+
+    def setUp(self):
+        caches['qr_codes'].clear()
+
+    def test_create_links_rendered_qr_code_without_a_job(self):
+        booking = self.client.post(reverse('booking:create_booking'), booking_payload(future_slot())).json()['booking']
+
+        first = self.client.get(booking['qr_code'])
+        with mock.patch('booking.qr.render_qr_png') as render_qr_png:
+            revalidated = self.client.get(booking['qr_code'], HTTP_IF_NONE_MATCH=first['ETag'])
+            unversioned = self.client.get(reverse('booking:booking_qr', args=[booking['id']]))
+
+        render_qr_png.assert_not_called()
+        self.assertEqual(booking['qr_status'], 'ready')
+        self.assertFalse(QrJob.objects.exists())
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertTrue(first.content.startswith(b'\x89PNG'))
+        self.assertEqual(first['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(unversioned.content, first.content)
+        self.assertEqual(unversioned['Cache-Control'], 'public, max-age=300')
+
+    def test_outdated_version_is_not_cached_for_good(self):
+        booking = self.client.post(reverse('booking:create_booking'), booking_payload(future_slot())).json()['booking']
+        renamed = Booking.objects.get(pk=booking['id'])
+        renamed.name = 'Renamed'
+        renamed.save()
+        url = reverse('booking:booking_qr', args=[booking['id']])
+
+        outdated = self.client.get(url, {'v': int(renamed.updated_at.timestamp()) - 5})
+        current = self.client.get(url, {'v': int(renamed.updated_at.timestamp())})
+
+        self.assertEqual(outdated['Cache-Control'], 'public, max-age=300')
+        self.assertEqual(current['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_ticket_embeds_rendered_qr_code(self):
+        booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+        response = self.client.get(reverse('booking:generate_booking_pdf'), {'booking_id': booking.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/Subtype /Image', response.content)
+
+    def test_drop_qr_files_deletes_stored_images(self):
+        booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+        booking.qr_code.save(f'qr_{booking.id}.png', ContentFile(b'png'))
+        path = booking.qr_code.path
+
+        with override_settings(BOOKING_QR_MODE='stored'), self.assertRaises(CommandError):
+            call_command('drop_qr_files', stdout=io.StringIO())
+        call_command('drop_qr_files', stdout=io.StringIO())
+
+        booking.refresh_from_db()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual((booking.qr_code.name, booking.qr_status), ('', 'ready'))
+
+
+@override_settings(BOOKING_EXPORT_CHUNK_SIZE=1)
+class ExportTests(TestCase):
+    """
+    Tests for the streaming NDJSON and CSV exports.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.old = Booking.objects.create(name='Old', civil_id=123456789012, start_time=future_slot(days=-60))
+        call_command('archive_bookings', stdout=io.StringIO())
+        self.first = Booking.objects.create(name='First', civil_id=123456789012, start_time=future_slot(hour=9))
+        self.second = Booking.objects.create(name='Second, Jr.', civil_id=123456789013, start_time=future_slot(days=2))
+
+    def export(self, **params):
+        response = self.client.get(reverse('booking:export_bookings'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_includes_archived_bookings_in_id_order(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [self.old.id, self.first.id, self.second.id])
+        self.assertEqual(rows[1]['name'], 'First')
+        self.assertEqual(rows[1]['civil_id'], 123456789012)
+
+    def test_csv_applies_start_filters(self):
+        lines = self.export(format='csv', start_from=future_slot(days=2).date().isoformat()).decode().splitlines()
+
+        self.assertEqual(lines[0].split(','), ['id', 'name', 'civil_id', 'resource_id', 'start_time', 'qr_status',
+                                               'created_at', 'updated_at'])
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{self.second.id},"Second, Jr.",123456789013,'))
+
+    def test_since_returns_changed_bookings_in_update_order(self):
+        since = datetime.now(tz=timezone.utc)
+        Booking.objects.filter(pk=self.second.pk).update(name='Renamed', updated_at=since + timedelta(seconds=1))
+        Booking.objects.filter(pk=self.first.pk).update(updated_at=since + timedelta(seconds=2))
+
+        rows = [json.loads(line) for line in self.export(since=since.isoformat()).splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [self.second.id, self.first.id])
+        self.assertEqual(rows[0]['name'], 'Renamed')
+
+    def test_rejects_invalid_parameters(self):
+        url = reverse('booking:export_bookings')
+
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+
+    def test_gzip_when_accepted(self):
+        response = self.client.get(reverse('booking:export_bookings'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.export())
+
+    @override_settings(BOOKING_EXPORT_MAX_CONCURRENCY=1)
+    def test_concurrency_slot_is_held_until_the_stream_is_sent(self):
+        url = reverse('booking:export_bookings')
+        first = self.client.get(url)
+
+        self.assertEqual(self.client.get(url).status_code, 503)
+        b''.join(first.streaming_content)
+        self.assertEqual(cache.get(inflight_key('export_bookings')), 0)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_command_writes_compressed_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bookings.csv.gz')
+            call_command('export_bookings', format='csv', output=path, gzip=True, since='2000-01-01')
+            with gzip.open(path, 'rt') as export:
+                lines = export.read().splitlines()
+
+        self.assertEqual(len(lines), 4)
+        with self.assertRaises(CommandError):
+            call_command('export_bookings', since='soon')
+
+
+class SlotEventsTests(TestCase):
+    """
+    Tests for the live slot event stream and its broadcaster.
+    """
+
+    def setUp(self):
+        self.broadcaster = LocalBroadcaster(history=2)
+        previous = set_broadcaster(self.broadcaster)
+        self.addCleanup(set_broadcaster, previous)
+
+    def published(self):
+        return [(event.type, json.loads(event.data)) for _, event in self.broadcaster.history]
+
+    def test_committed_changes_publish_slot_events(self):
+        slot, later = future_slot(hour=9), future_slot(hour=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=slot)
+        self.assertEqual(self.published(), [('slot_taken', {'resource': booking.resource_id,
+                                                             'start_time': slot.isoformat()[:-6] + 'Z'})])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.start_time = later
+            booking.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+
+        self.assertEqual([event_type for event_type, _ in self.published()], ['slot_taken', 'slot_freed'])
+        self.assertEqual(self.published()[1][1]['start_time'], later.isoformat()[:-6] + 'Z')
+
+    async def test_stream_resumes_after_the_last_event_seen(self):
+        url = reverse('booking_async:slot_events')
+        seen = self.broadcaster.publish('slot_taken', {'resource': 1}, 1)
+        self.broadcaster.publish('slot_taken', {'resource': 2}, 2)
+        self.broadcaster.publish('slot_freed', {'resource': 1}, 1)
+
+        response = await self.async_client.get(url, {'resource': 1}, headers={'Last-Event-ID': seen.id})
+        chunks = aiter(response.streaming_content)
+        missed = await anext(chunks)
+        live = await sync_to_async(self.broadcaster.publish)('slot_taken', {'resource': 1}, 1)
+        self.assertEqual(await anext(chunks), f'id: {live.id}\nevent: slot_taken\ndata: {{"resource": 1}}\n\n'.encode())
+        await response.streaming_content.aclose()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(missed.endswith(b'event: slot_freed\ndata: {"resource": 1}\n\n'))
+
+    def test_stream_is_not_served_under_wsgi(self):
+        response = self.client.get(reverse('booking_async:slot_events'))
+
+        self.assertEqual(response.status_code, 501)
+
+    async def test_idle_stream_sends_keep_alives(self):
+        with self.settings(BOOKING_EVENTS_KEEPALIVE=0.01):
+            response = await self.async_client.get(reverse('booking_async:slot_events'))
+            chunks = aiter(response.streaming_content)
+            ready, idle = await anext(chunks), await anext(chunks)
+            await response.streaming_content.aclose()
+
+        self.assertIn(b'event: ready', ready)
+        self.assertEqual(idle, b': keep-alive\n\n')
+
+    async def test_stale_id_or_slow_client_gets_a_reset(self):
+        stale = await self.async_client.get(reverse('booking_async:slot_events'), headers={'Last-Event-ID': '0-1'})
+        invalid = await self.async_client.get(reverse('booking_async:slot_events'), {'resource': 'x'})
+
+        broadcaster = LocalBroadcaster(queue_size=1)
+        slow = broadcaster.subscribe()
+        self.assertEqual((await anext(slow)).type, 'ready')
+        for resource_id in (1, 2, 3):
+            broadcaster.publish('slot_taken', {'resource': resource_id}, resource_id)
+        received = [event.type async for event in slow]
+
+        self.assertEqual(received, ['slot_taken', 'reset'])
+        self.assertFalse(broadcaster.subscribers)
+
+        self.assertIn(b'event: reset', b''.join([chunk async for chunk in stale.streaming_content]))
+        self.assertEqual(invalid.status_code, 400)
+
+
+@skipUnless('replica' in settings.DATABASES, 'The test replica is declared in booking_system.settings_test')
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, BOOKING_READ_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """
+    Tests for routing reads to a replica, with a second SQLite file standing in for it.
+    The replica is never written to, so reads served from it see none of the primary's bookings.
+    """
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        _unavailable.clear()
+        self.addCleanup(_unavailable.clear)
+        self.booking = Booking.objects.create(name='Guest', civil_id=123456789012, start_time=future_slot())
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        listed = self.client.get(reverse('booking:get_all_bookings')).json()
+        pdf = self.client.get(reverse('booking:generate_booking_pdf'), {'booking_id': self.booking.id})
+        exported = self.client.get(reverse('booking:export_bookings'))
+        tickets = self.client.get(reverse('booking:export_booking_pdfs'), {'ids': self.booking.id, 'output': 'zip'})
+
+        self.assertEqual(listed['bookings'], [])
+        self.assertEqual(pdf.status_code, 404)
+        self.assertEqual(b''.join(exported.streaming_content), b'')
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(b''.join(tickets.streaming_content))).namelist(), [])
+        self.assertFalse(Booking.objects.using('replica').exists())
+
+    def test_client_reads_its_own_writes_from_the_primary(self):
+        created = self.client.post(reverse('booking:create_booking'), booking_payload(future_slot(days=2)))
+        sticky = self.client.get(reverse('booking:get_all_bookings')).json()
+        self.client.cookies.pop(PRIMARY_COOKIE)
+        other = self.client.get(reverse('booking:get_all_bookings')).json()
+
+        self.assertEqual(created.cookies[PRIMARY_COOKIE]['max-age'], 5)
+        self.assertEqual(len(sticky['bookings']), 2)
+        self.assertEqual(other['bookings'], [])
+
+    def test_falls_back_to_the_primary_when_the_replica_is_down(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError):
+            listed = self.client.get(reverse('booking:get_all_bookings')).json()
+        again = self.client.get(reverse('booking:get_all_bookings')).json()
+
+        self.assertEqual([booking['id'] for booking in listed['bookings']], [self.booking.id])
+        self.assertEqual(len(again['bookings']), 1)
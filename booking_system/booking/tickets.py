@@ -0,0 +1,256 @@
+import io
+import logging
+import multiprocessing
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from booking.metrics import span, ticket_cache_requests
+from booking.slots import slot_duration
+
+logger = logging.getLogger(__name__)
+
+
+def ticket_cache():
+    """
+    Returns the size-bounded LRU cache holding rendered tickets.
+    """
+    return caches[settings.BOOKING_TICKET_CACHE_ALIAS]
+
+
+def ticket_cache_key(booking_id):
+    """
+    Returns the cache key of a booking's rendered ticket.
+    """
+    return f'booking:ticket:{booking_id}'
+
+
+class TicketData(NamedTuple):
+    """
+    Plain, picklable snapshot of everything printed on a ticket,
+    so tickets can be rendered in worker processes without the ORM.
+    """
+    id: int
+    name: str
+    civil_id: int
+    start_time: object
+    end_time: object
+    qr_code_path: str
+    qr_payload: str
+
+
+def ticket_data(booking):
+    """
+    Takes the ticket snapshot of a booking.
+    Stored QR codes are referenced by file path, on-demand ones by their payload.
+    """
+    from booking.qr import qr_on_demand, qr_payload
+
+    on_demand = qr_on_demand()
+    return TicketData(
+        id=booking.id,
+        name=booking.name,
+        civil_id=booking.civil_id,
+        start_time=booking.start_time,
+        end_time=booking.start_time + slot_duration(),
+        qr_code_path=booking.qr_code.path if booking.qr_code and not on_demand else '',
+        qr_payload=qr_payload(booking) if on_demand else '',
+    )
+
+
+def new_canvas(buffer):
+    """
+    Returns a ReportLab canvas writing to the buffer.
+    ReportLab is imported on first use, so processes that never render a ticket do not load it.
+    """
+    from reportlab.pdfgen import canvas
+
+    return canvas.Canvas(buffer)
+
+
+def draw_ticket(p, ticket):
+    """
+    Draws one ticket on the current page of a ReportLab canvas.
+    """
+    # Add text information to the PDF
+    p.drawString(100, 800, f"Booking Ticket")
+    p.drawString(100, 780, f"Booking ID: {ticket.id}")
+    p.drawString(100, 760, f"Name: {ticket.name}")
+    p.drawString(100, 740, f"Civil ID: {ticket.civil_id}")
+    p.drawString(100, 720, f"Start Time: {ticket.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    p.drawString(100, 700, f"End Time: {ticket.end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # Attempt to add the QR code image to the PDF
+    try:
+        if ticket.qr_code_path:
+            p.drawImage(ticket.qr_code_path, 100, 600, width=100, height=100)
+        elif ticket.qr_payload:
+            from reportlab.lib.utils import ImageReader
+
+            from booking.qr import get_qr_png
+
+            p.drawImage(ImageReader(io.BytesIO(get_qr_png(ticket.qr_payload))), 100, 600, width=100, height=100)
+    except Exception:
+        # Log error if QR code image cannot be added; the ticket is still issued without it
+        logger.exception("Error drawing QR code for booking %s", ticket.id)
+
+
+def render_ticket_pdf(ticket):
+    """
+    Renders a single-ticket PDF and returns the document bytes.
+    """
+    buffer = io.BytesIO()
+    p = new_canvas(buffer)
+    with span('render_ticket_pdf', 'draw'):
+        draw_ticket(p, ticket)
+
+    # Finalize and save the PDF
+    with span('render_ticket_pdf', 'save'):
+        p.showPage()
+        p.save()
+    return buffer.getvalue()
+
+
+def get_ticket_pdf(booking):
+    """
+    Returns the PDF ticket of a booking and whether it was served from the cache.
+    Cached tickets are tagged with the booking's updated_at, so any change to the
+    booking turns the cached copy into a miss and the ticket is rendered again.
+    """
+    key = ticket_cache_key(booking.id)
+    version = booking.updated_at.isoformat()
+
+    with span('get_ticket_pdf', 'cache_get'):
+        cached = ticket_cache().get(key)
+    if cached is not None and cached[0] == version:
+        ticket_cache_requests.labels('hit').inc()
+        return cached[1], True
+
+    ticket_cache_requests.labels('miss').inc()
+    pdf = render_ticket_pdf(ticket_data(booking))
+    ticket_cache().set(key, (version, pdf))
+    return pdf, False
+
+
+def invalidate_ticket(booking_id):
+    """
+    Drops the cached ticket of a booking.
+    """
+    ticket_cache().delete(ticket_cache_key(booking_id))
+
+
+def render_tickets_pdf(tickets):
+    """
+    Renders many tickets into one multi-page PDF, one ticket per page, and returns the document bytes.
+    """
+    buffer = io.BytesIO()
+    p = new_canvas(buffer)
+    for ticket in tickets:
+        draw_ticket(p, ticket)
+        p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+_export_pool = None
+_export_pool_lock = threading.Lock()
+
+
+def init_export_worker():
+    """
+    Sets Django up in a spawned export worker, so drawing on-demand QR codes can import the models.
+    This module stays free of model imports at import time: workers import it before running this.
+    """
+    import django
+
+    django.setup()
+
+
+def export_pool():
+    """
+    Returns the process pool used to render exported tickets, or None when exports render in-process.
+    Workers are spawned rather than forked so they never inherit the web worker's threads or connections.
+    """
+    global _export_pool
+    if not settings.BOOKING_TICKET_EXPORT_WORKERS:
+        return None
+
+    with _export_pool_lock:
+        if _export_pool is None:
+            _export_pool = ProcessPoolExecutor(
+                max_workers=settings.BOOKING_TICKET_EXPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_export_worker,
+            )
+        return _export_pool
+
+
+def shutdown_export_pool():
+    """
+    Stops the export workers; the next export starts a new pool.
+    """
+    global _export_pool
+    with _export_pool_lock:
+        if _export_pool is not None:
+            _export_pool.shutdown()
+            _export_pool = None
+
+
+def render_tickets(tickets):
+    """
+    Yields (ticket, pdf bytes) pairs in order, rendering ahead across the export pool.
+    At most a few tickets per worker are in flight, so memory stays flat for any batch size.
+    """
+    pool = export_pool()
+    if pool is None:
+        for ticket in tickets:
+            yield ticket, render_ticket_pdf(ticket)
+        return
+
+    window = deque()
+    max_in_flight = settings.BOOKING_TICKET_EXPORT_WORKERS * 4
+    for ticket in tickets:
+        window.append((ticket, pool.submit(render_ticket_pdf, ticket)))
+        if len(window) >= max_in_flight:
+            done_ticket, future = window.popleft()
+            yield done_ticket, future.result()
+    while window:
+        done_ticket, future = window.popleft()
+        yield done_ticket, future.result()
+
+
+class _StreamBuffer:
+    """
+    Write-only file object that hands the bytes written so far to a generator.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_tickets_zip(tickets):
+    """
+    Yields a ZIP archive with one PDF per ticket, chunk by chunk, as the tickets are rendered.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for ticket, pdf in render_tickets(tickets):
+            archive.writestr(f"Booking_{ticket.id}.pdf", pdf)
+            yield buffer.drain()
+    yield buffer.drain()
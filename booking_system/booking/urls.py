@@ -1,22 +1,50 @@
 from django.urls import path, include
 
 # Import views from the booking app
-from booking import views
+from booking import async_views, views
 
 # Define booking-specific URL patterns
 booking_urls = [
     # URL for creating a booking
     path('create/', views.create_booking, name='create_booking'),
 
+    # URL for creating many bookings in one request
+    path('bulk-create/', views.bulk_create_bookings, name='bulk_create_bookings'),
+
     # URL for listing all bookings
     path('list/', views.get_all_bookings, name='get_all_bookings'),
 
+    # URL for listing free and taken slots over a date range
+    path('availability/', views.get_availability, name='get_availability'),
+
     # URL for generating a PDF for a specific booking
     path('pdf/', views.generate_booking_pdf, name='generate_booking_pdf'),
+
+    # URL for exporting the tickets of many bookings as one PDF or a ZIP archive
+    path('pdf/export/', views.export_booking_pdfs, name='export_booking_pdfs'),
+
+    # URL for streaming bookings as NDJSON or CSV for reporting
+    path('export/', views.export_bookings, name='export_bookings'),
+
+    # URL for the QR code image of a booking, rendered on demand
+    path('<int:booking_id>/qr.png', views.booking_qr, name='booking_qr'),
+]
+
+# Async versions of the hot endpoints for ASGI deployments
+async_booking_urls = [
+    path('create/', async_views.create_booking, name='create_booking'),
+    path('list/', async_views.get_all_bookings, name='get_all_bookings'),
+    path('pdf/', async_views.generate_booking_pdf, name='generate_booking_pdf'),
+
+    # URL for the live stream of slot events (Server-Sent Events)
+    path('events/', async_views.slot_events, name='slot_events'),
 ]
 
 # Main URL configuration
 urlpatterns = [
     # Prefix all booking-related URLs with '/bookings' using the include() function
     path('bookings/', include((booking_urls, 'booking'))),
+
+    # Prefix the async endpoints with '/bookings/async'
+    path('bookings/async/', include((async_booking_urls, 'booking_async'))),
 ]
@@ -1,19 +1,49 @@
-import json
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from datetime import timedelta
-import io
-import qrcode
-from django.core.files.base import ContentFile
-from booking.models import Booking
-from reportlab.pdfgen import canvas
+from drf_yasg.renderers import SwaggerUIRenderer
+import re
+from datetime import date, timedelta
+from booking.models import Booking, Resource
 
 # Importing necessary modules and settings
 from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
 
-from booking.serializers import BookingSerializer
+from booking.admission import admission_control
+from booking.archive import booking_sources, get_booking, merge_by_start_time
+from booking.availability import build_availability
+from booking.conditional import booking_last_modified, list_etag, make_etag, not_modified, set_validators
+from booking.exports import EXPORT_CONTENT_TYPES, export_filters, export_stream
+from booking.idempotency import idempotent
+from booking.metrics import render_metrics, span
+from booking.openapi import API_INFO, schema_artifacts
+from booking.pagination import decode_cursor, merged_keyset_page, parse_limit
+from booking.qr import get_qr_png, qr_payload, qr_version
+from booking.replicas import reads_from_replica
+from booking.resources import get_resource
+from booking.reservations import SlotTakenError, find_conflicts, reserve_booking, reserve_bookings
+from booking.serializers import (
+    BookingSerializer, booking_representer, booking_row, booking_rows, encode_json, represent_bookings
+)
+from booking.slots import day_range
+from booking.tickets import get_ticket_pdf, render_tickets_pdf, stream_tickets_zip, ticket_data
+
+# Content types for the streaming modes of the bookings list
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Number of encoded bookings sent per chunk of a streamed list
+STREAM_ROWS_PER_CHUNK = 500
 
 # Swagger parameter definitions for documentation
 name_param = openapi.Parameter(
@@ -25,103 +55,364 @@ civil_id_param = openapi.Parameter(
 start_time_param = openapi.Parameter(
     'start_time', openapi.IN_BODY, description="Start time in format YYYY-MM-DD HH:MM:SS", type=openapi.TYPE_STRING, required=True
 )
+idempotency_key_param = openapi.Parameter(
+    'Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING,
+    description="Client-chosen key; retries with the same key replay the original response instead of booking again"
+)
 
+@admission_control('create_booking', 'BOOKING_CREATE_MAX_CONCURRENCY', by_civil_id=True)
+@idempotent
 @swagger_auto_schema(
     method='post',
-    manual_parameters=[],
+    manual_parameters=[idempotency_key_param],
     request_body=openapi.Schema(
         type=openapi.TYPE_OBJECT,
         properties={
             'name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the user'),
             'civil_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='Civil ID of the user'),
             'start_time': openapi.Schema(type=openapi.TYPE_STRING, description='Start time in format YYYY-MM-DD HH:MM'),
+            'resource': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the resource (defaults to the default resource)'),
         },
         required=['name', 'civil_id', 'start_time'],
     ),
-    responses={200: "Booking created successfully", 400: "Error message"}
+    responses={
+        200: "Booking created successfully", 400: "Error message",
+        409: "A request with the same Idempotency-Key is still being processed",
+        422: "The Idempotency-Key was used for a different request",
+        429: "Rate limit exceeded, see Retry-After", 503: "Too many concurrent requests, see Retry-After",
+    }
 )
 @api_view(['POST'])
 def create_booking(request):
     """
     Handles POST requests to create a new booking.
-    Validates booking data, checks for overlapping time slots,
-    saves the booking, and generates a QR code.
+    Validates booking data, atomically reserves the time slot and saves the booking.
+    The QR code is generated in the background; its progress is reported as qr_status.
     """
     if request.method == 'POST':
         serializer = BookingSerializer(data=request.data)
-        if serializer.is_valid():
-            # Calculate booking duration and check for time slot conflicts
-            duration_minutes = settings.BOOKING_DURATION
-            start_time = serializer.validated_data['start_time']
-            end_time = start_time + timedelta(minutes=duration_minutes)
-
-            overlapping_booking = Booking.objects.filter(
-                start_time__lt=end_time, start_time__gte=start_time
-            ).exists()
-
-            if overlapping_booking:
+        with span('create_booking', 'validate'):
+            valid = serializer.is_valid()
+        if valid:
+            try:
+                # Reserve the slot, insert the booking and queue its QR code in a single transaction
+                with span('create_booking', 'reserve'):
+                    booking = reserve_booking(serializer)
+            except SlotTakenError as exc:
                 # Return error if there is a conflict with an existing booking
-                return JsonResponse({'error': 'A booking already exists for the selected time slot.'}, status=400)
-
-            # Save the booking and generate a QR code for it
-            booking = serializer.save()
-            qr_data = f"Booking for '{booking.name}' from {start_time} to {end_time}"
-            qr = qrcode.make(qr_data)
-            qr_io = io.BytesIO()
-            qr.save(qr_io, format='PNG')
-            booking.qr_code.save(f"qr_{booking.name}.png", ContentFile(qr_io.getvalue()), save=False)
-            booking.save()
+                return JsonResponse({'error': str(exc)}, status=400)
 
             # Return a success response with the booking details
-            response_data = {
-                'message': 'Booking created successfully',
-                'booking': BookingSerializer(booking).data
-            }
-            return JsonResponse(response_data, status=200)
+            with span('create_booking', 'serialize'):
+                response_data = {
+                    'message': 'Booking created successfully',
+                    'booking': booking_representer()(booking_row(booking))
+                }
+                body = encode_json(response_data)
+            return HttpResponse(body, content_type='application/json', status=200)
 
         # Return validation errors if any
         return JsonResponse(serializer.errors, status=400)
 
 
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_ARRAY,
+        items=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'name': openapi.Schema(type=openapi.TYPE_STRING, description='Name of the user'),
+                'civil_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='Civil ID of the user'),
+                'start_time': openapi.Schema(type=openapi.TYPE_STRING, description='Start time in format YYYY-MM-DD HH:MM'),
+                'resource': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the resource (defaults to the default resource)'),
+            },
+            required=['name', 'civil_id', 'start_time'],
+        ),
+    ),
+    responses={200: "Per-item results", 400: "Invalid request", 409: "A slot was booked concurrently"}
+)
+@api_view(['POST'])
+def bulk_create_bookings(request):
+    """
+    Handles POST requests to create many bookings at once.
+    Every item is validated, slot capacity is checked against the counters and within the
+    batch in one sorted sweep, and the valid bookings are inserted in a single transaction.
+    QR codes are queued for the background workers. Returns a result for every item.
+    """
+    items = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list):
+        return JsonResponse({'error': 'Expected a list of bookings.'}, status=400)
+    if len(items) > settings.BOOKING_BULK_CREATE_MAX:
+        return JsonResponse(
+            {'error': f'A batch can contain at most {settings.BOOKING_BULK_CREATE_MAX} bookings.'}, status=400
+        )
+
+    # Validate every item with one serializer instance instead of one per item,
+    # resolving resources from one read of the (small) resource table
+    results = [None] * len(items)
+    validated = {}
+    validator = BookingSerializer(context={'resources': Resource.objects.in_bulk()})
+    default_resource = get_resource()
+    for index, item in enumerate(items):
+        try:
+            validated[index] = validator.run_validation(item)
+            validated[index].setdefault('resource', default_resource)
+        except ValidationError as exc:
+            results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+
+    # Reject items that do not fit into their slot next to existing bookings and earlier items of the batch
+    conflicts = find_conflicts([(index, data['resource'], data['start_time']) for index, data in validated.items()])
+    for index, error in conflicts.items():
+        results[index] = {'index': index, 'status': 'error', 'errors': {'start_time': [error]}}
+        del validated[index]
+
+    try:
+        bookings = reserve_bookings(list(validated.values()))
+    except SlotTakenError as exc:
+        return JsonResponse({'error': str(exc)}, status=409)
+
+    represent = booking_representer()
+    for index, booking in zip(validated, bookings):
+        results[index] = {'index': index, 'status': 'created', 'booking': represent(booking_row(booking))}
+
+    response_data = {
+        'created': len(bookings),
+        'failed': len(items) - len(bookings),
+        'results': results,
+    }
+    return HttpResponse(encode_json(response_data), content_type='application/json', status=200)
+
+
+@reads_from_replica
 @swagger_auto_schema(
     method='get',
+    manual_parameters=[
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor returned as next_cursor by the previous page", type=openapi.TYPE_STRING),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Number of bookings per page", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('stream', openapi.IN_QUERY, description="Stream the full result set instead of a page", type=openapi.TYPE_STRING, enum=['json', 'ndjson']),
+        openapi.Parameter('from', openapi.IN_QUERY, description="Only bookings starting on or after this day (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        openapi.Parameter('to', openapi.IN_QUERY, description="Only bookings starting on or before this day (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        openapi.Parameter('resource', openapi.IN_QUERY, description="Only bookings on this resource", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('civil_id', openapi.IN_QUERY, description="Only bookings of this civil ID", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('name', openapi.IN_QUERY, description="Only bookings whose name starts with this text (case-insensitive)", type=openapi.TYPE_STRING),
+    ],
     responses={
         200: openapi.Response(
-            description="List of all bookings"
+            description="Page of bookings ordered by start time, or the full list when streaming"
         ),
-        400: "Invalid request method"
+        400: "Invalid request"
     }
 )
 @api_view(['GET'])
 def get_all_bookings(request):
     """
-    Handles GET requests to retrieve all bookings.
-    Serializes and returns the booking data.
+    Handles GET requests to retrieve bookings.
+    Returns one keyset-paginated page ordered by (start_time, id),
+    or streams every booking when the stream parameter is given.
+    Archived bookings are included when the requested range reaches into the archive.
+    Answers If-None-Match with a 304 while no booking has changed.
     """
     if request.method == 'GET':
-        # Fetch all bookings from the database
-        bookings = Booking.objects.all()
+        stream_format = request.GET.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_CONTENT_TYPES:
+                return JsonResponse({'error': 'stream must be one of: json, ndjson.'}, status=400)
+        else:
+            try:
+                limit = parse_limit(request.GET.get('limit'))
+            except ValueError as exc:
+                return JsonResponse({'error': str(exc)}, status=400)
+
+        try:
+            # Read the hot table, and the archive only when the range reaches into it
+            querysets = list_querysets(request.GET)
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
 
-        # Serialize the booking data
-        serializer = BookingSerializer(bookings, many=True)
+        # Skip the query and serialization when the client's copy is still current
+        etag = list_etag(request)
+        unchanged = not_modified(request, etag, None)
+        if unchanged is not None:
+            return unchanged
+
+        if stream_format:
+            # Stream every booking in constant memory
+            bookings = merge_by_start_time(*(
+                queryset.order_by('start_time', 'id').iterator(chunk_size=settings.BOOKING_STREAM_CHUNK_SIZE)
+                for queryset in querysets
+            ))
+            response = StreamingHttpResponse(
+                stream_bookings(bookings, stream_format), content_type=STREAM_CONTENT_TYPES[stream_format]
+            )
+            return set_validators(response, etag, None)
+
+        # Fetch one page of bookings past the cursor position
+        bookings, next_cursor = merged_keyset_page(querysets, request.GET.get('cursor'), limit)
+
+        # Serialize the booking rows through the fast read path
+        response_data = {"bookings": represent_bookings(bookings), "next_cursor": next_cursor}
 
         # Return serialized data as a JSON response
-        return JsonResponse({"bookings": serializer.data}, status=200)
+        response = HttpResponse(encode_json(response_data), content_type='application/json', status=200)
+        return set_validators(response, etag, None)
     return JsonResponse({'error': 'Invalid request method.'}, status=400)
 
 
+def list_querysets(params):
+    """
+    Returns the booking row querysets the list reads for the request parameters: the hot table
+    limited to the optional from/to days, resource, civil_id and name prefix, plus the archive when
+    the range or the cursor reaches into it. Raises ValueError with a client-facing message for
+    invalid parameters.
+    """
+    try:
+        first_day = date.fromisoformat(params['from']) if 'from' in params else None
+        last_day = date.fromisoformat(params['to']) if 'to' in params else None
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD.') from None
+
+    filters = {}
+    if 'resource' in params:
+        try:
+            filters['resource_id'] = int(params['resource'])
+        except ValueError:
+            raise ValueError('resource must be an integer.') from None
+    if 'civil_id' in params:
+        try:
+            filters['civil_id'] = int(params['civil_id'])
+        except ValueError:
+            raise ValueError('civil_id must be an integer.') from None
+    # Name prefixes match case-insensitively. SQLite compares text bytewise, so there an ASCII prefix
+    # is a range seeking the index on UPPER(name); SQLite's UPPER only folds ASCII letters, so other
+    # prefixes fall back to an unindexed istartswith. Locale collations (PostgreSQL) do not keep the
+    # names sharing a prefix together, so there every prefix goes through istartswith, which is
+    # UPPER(name) LIKE 'P%' and seeks the text_pattern_ops index (migration 0011)
+    name_prefix = params.get('name', '').strip()
+    if name_prefix and name_prefix.isascii() and connection.vendor == 'sqlite':
+        name_prefix = name_prefix.upper()
+        filters['name_upper__gte'] = name_prefix
+        filters['name_upper__lt'] = name_prefix[:-1] + chr(ord(name_prefix[-1]) + 1)
+    elif name_prefix:
+        filters['name__istartswith'] = name_prefix
+    seek_start = None
+    if first_day:
+        seek_start = filters['start_time__gte'] = day_range(first_day, first_day)[0]
+    if last_day:
+        filters['start_time__lt'] = day_range(last_day, last_day)[1]
+
+    # Later pages start at their cursor, which usually lies past the archive
+    if params.get('cursor'):
+        cursor_start, _ = decode_cursor(params['cursor'])
+        seek_start = max(seek_start, cursor_start) if seek_start else cursor_start
+
+    return [
+        booking_rows(queryset.alias(name_upper=Upper('name')).filter(**filters))
+        for queryset in booking_sources(seek_start)
+    ]
+
+
+def stream_bookings(bookings, stream_format):
+    """
+    Yields serialized bookings in chunks, either as a single JSON document
+    or as newline-delimited JSON, so the response never holds the full result set.
+    """
+    represent = booking_representer()
+    if stream_format == 'json':
+        yield b'{"bookings": ['
+
+    separator = b''
+    chunk = []
+    for booking in bookings:
+        chunk.append(encode_json(represent(booking)))
+        if len(chunk) == STREAM_ROWS_PER_CHUNK:
+            yield encode_stream_chunk(chunk, stream_format, separator)
+            separator = b', '
+            chunk = []
+    if chunk:
+        yield encode_stream_chunk(chunk, stream_format, separator)
+
+    if stream_format == 'json':
+        yield b']}'
+
+
+def encode_stream_chunk(rows, stream_format, separator):
+    """
+    Joins encoded bookings into one chunk of a streamed list.
+    JSON chunks after the first are prefixed with the separator from the previous chunk.
+    """
+    if stream_format == 'ndjson':
+        return b''.join(row + b'\n' for row in rows)
+    return separator + b', '.join(rows)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('from', openapi.IN_QUERY, description="First day in format YYYY-MM-DD (defaults to today)", type=openapi.TYPE_STRING),
+        openapi.Parameter('to', openapi.IN_QUERY, description="Last day in format YYYY-MM-DD (defaults to six days after from)", type=openapi.TYPE_STRING),
+        openapi.Parameter('resource', openapi.IN_QUERY, description="ID of the resource (defaults to the default resource)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: "Free and full slots per day", 400: "Invalid date range or resource"}
+)
+@api_view(['GET'])
+def get_availability(request):
+    """
+    Handles GET requests for slot availability over a date range.
+    Slots are derived from the booking window settings and answered from
+    the cached per-day occupancy bitmaps of the requested resource.
+    Reads stay on the primary: the bitmaps are cached for every client,
+    so a lagging replica read would be served until they expire.
+    """
+    try:
+        first_day = date.fromisoformat(request.GET['from']) if 'from' in request.GET else timezone.now().date()
+        last_day = date.fromisoformat(request.GET['to']) if 'to' in request.GET else first_day + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+
+    if last_day < first_day:
+        return JsonResponse({'error': 'The to date must not be before the from date.'}, status=400)
+    if (last_day - first_day).days >= settings.BOOKING_AVAILABILITY_MAX_DAYS:
+        return JsonResponse(
+            {'error': f'The date range can cover at most {settings.BOOKING_AVAILABILITY_MAX_DAYS} days.'}, status=400
+        )
+
+    try:
+        # Look up the resource, usually from the cache
+        resource = get_resource(int(request.GET['resource']) if 'resource' in request.GET else None)
+    except (ValueError, Resource.DoesNotExist):
+        return JsonResponse({'error': 'Unknown resource.'}, status=400)
+
+    response_data = {
+        'from': first_day.isoformat(),
+        'to': last_day.isoformat(),
+        'resource': resource.pk,
+        'capacity': resource.capacity,
+        'slot_duration': settings.BOOKING_DURATION,
+        'days': build_availability(first_day, last_day, resource),
+    }
+    return JsonResponse(response_data, status=200)
+
+
+@admission_control('generate_booking_pdf', 'BOOKING_PDF_MAX_CONCURRENCY')
+@reads_from_replica
 @swagger_auto_schema(
     method='get',
     manual_parameters=[
         openapi.Parameter('booking_id', openapi.IN_QUERY, description="ID of the booking", type=openapi.TYPE_INTEGER)
     ],
-    responses={200: "PDF generated successfully", 400: "Invalid request"}
+    responses={
+        200: "PDF generated successfully", 400: "Invalid request",
+        429: "Rate limit exceeded, see Retry-After", 503: "Too many concurrent requests, see Retry-After",
+    }
 )
 @api_view(['GET'])
 def generate_booking_pdf(request):
     """
     Handles GET requests to generate a PDF ticket for a specific booking.
     The PDF includes booking details and the QR code (if available).
+    Rendered tickets are cached until the booking changes, and clients holding
+    the current version get a 304 without the booking being loaded.
     """
     booking_id = request.GET.get('booking_id')
 
@@ -130,40 +421,202 @@ def generate_booking_pdf(request):
         return JsonResponse({'error': 'Booking ID is required.'}, status=400)
 
     try:
-        # Retrieve the booking from the database
-        booking = Booking.objects.get(id=booking_id)
-    except Booking.DoesNotExist:
+        # Look up the booking's version, usually from the cache
+        with span('generate_booking_pdf', 'lookup'):
+            last_modified = booking_last_modified(int(booking_id))
+    except ValueError:
+        last_modified = None
+    if last_modified is None:
         # Return error if booking is not found
         return JsonResponse({'error': 'Booking not found.'}, status=404)
 
-    # Generate the PDF with booking details
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer)
-
-    # Add text information to the PDF
-    p.drawString(100, 800, f"Booking Ticket")
-    p.drawString(100, 780, f"Booking ID: {booking.id}")
-    p.drawString(100, 760, f"Name: {booking.name}")
-    p.drawString(100, 740, f"Civil ID: {booking.civil_id}")
-    p.drawString(100, 720, f"Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    p.drawString(100, 700, f"End Time: {(booking.start_time + timedelta(minutes=60)).strftime('%Y-%m-%d %H:%M:%S')}")
+    etag = make_etag('ticket', booking_id, last_modified.isoformat())
+    unchanged = not_modified(request, etag, last_modified)
+    if unchanged is not None:
+        return unchanged
 
-    # Attempt to add the QR code image to the PDF
     try:
-        if booking.qr_code:
-            qr_code_path = booking.qr_code.path
-            p.drawImage(qr_code_path, 100, 600, width=100, height=100)
-    except Exception as e:
-        # Log error if QR code image cannot be added
-        print(f"Error drawing QR Code: {e}")
+        # Retrieve the booking from the database, or from the archive if it was moved there
+        booking = get_booking(booking_id)
+    except Booking.DoesNotExist:
+        # Return error if booking is not found
+        return JsonResponse({'error': 'Booking not found.'}, status=404)
 
-    # Finalize and save the PDF
-    p.showPage()
-    p.save()
+    # Serve the ticket from the cache, rendering it only when the booking changed
+    pdf, cache_hit = get_ticket_pdf(booking)
 
     # Return the PDF as a response
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
+    response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="Booking_{booking_id}.pdf"'
-    buffer.close()
+    response['X-Ticket-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return set_validators(response, make_etag('ticket', booking_id, booking.updated_at.isoformat()), booking.updated_at)
+
+
+@reads_from_replica
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('ids', openapi.IN_QUERY, description="Comma-separated booking IDs", type=openapi.TYPE_STRING),
+        openapi.Parameter('from', openapi.IN_QUERY, description="First day in format YYYY-MM-DD", type=openapi.TYPE_STRING),
+        openapi.Parameter('to', openapi.IN_QUERY, description="Last day in format YYYY-MM-DD", type=openapi.TYPE_STRING),
+        openapi.Parameter('output', openapi.IN_QUERY, description="Single multi-page PDF or a ZIP of per-booking PDFs", type=openapi.TYPE_STRING, enum=['pdf', 'zip']),
+    ],
+    responses={200: "Tickets exported successfully", 400: "Invalid request"}
+)
+@api_view(['GET'])
+def export_booking_pdfs(request):
+    """
+    Handles GET requests to export the tickets of many bookings at once.
+    Bookings are selected by a list of IDs or a date range, fetched in one query per table
+    (the archive only when the range reaches into it), and returned as one multi-page PDF
+    or as a streamed ZIP of per-booking PDFs.
+    """
+    # The query parameter is not called "format", which DRF reserves for content negotiation
+    export_format = request.GET.get('output', 'pdf')
+    if export_format not in ('pdf', 'zip'):
+        return JsonResponse({'error': 'output must be one of: pdf, zip.'}, status=400)
+
+    if request.GET.get('ids'):
+        try:
+            booking_ids = [int(booking_id) for booking_id in request.GET['ids'].split(',')]
+        except ValueError:
+            return JsonResponse({'error': 'ids must be a comma-separated list of integers.'}, status=400)
+        querysets = [queryset.filter(id__in=booking_ids) for queryset in booking_sources()]
+    elif 'from' in request.GET and 'to' in request.GET:
+        try:
+            first_day = date.fromisoformat(request.GET['from'])
+            last_day = date.fromisoformat(request.GET['to'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
+        range_start, range_end = day_range(first_day, last_day)
+        querysets = [
+            queryset.filter(start_time__gte=range_start, start_time__lt=range_end)
+            for queryset in booking_sources(range_start)
+        ]
+    else:
+        return JsonResponse({'error': 'Either ids or a from/to date range is required.'}, status=400)
+
+    # Fetch one row past the limit to detect oversized batches without counting the whole range
+    querysets = [
+        queryset.order_by('start_time', 'id')[:settings.BOOKING_TICKET_EXPORT_MAX + 1] for queryset in querysets
+    ]
+    if sum(queryset.count() for queryset in querysets) > settings.BOOKING_TICKET_EXPORT_MAX:
+        return JsonResponse(
+            {'error': f'An export can contain at most {settings.BOOKING_TICKET_EXPORT_MAX} bookings.'}, status=400
+        )
+    bookings = merge_by_start_time(*(
+        queryset.iterator(chunk_size=settings.BOOKING_STREAM_CHUNK_SIZE) for queryset in querysets
+    ))
+    tickets = (ticket_data(booking) for booking in bookings)
+
+    if export_format == 'zip':
+        response = StreamingHttpResponse(stream_tickets_zip(tickets), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="Bookings.zip"'
+        return response
+
+    response = HttpResponse(render_tickets_pdf(tickets), content_type='application/pdf')
+    response['Content-Disposition'] = 'attachment; filename="Bookings.pdf"'
     return response
+
+
+@require_GET
+def metrics(request):
+    """
+    Exposes request latencies, query counts and phase timings in the Prometheus text format.
+    A plain Django view, so scrapes stay out of the API documentation and content negotiation.
+    """
+    content_type, body = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+@require_GET
+@admission_control('export_bookings', 'BOOKING_EXPORT_MAX_CONCURRENCY')
+@reads_from_replica
+def export_bookings(request):
+    """
+    Streams bookings for reporting as NDJSON (default) or CSV (?format=csv), current and archived,
+    optionally limited by start_from/start_before, created_from/created_before and since (updated_at).
+    Rows are read through server-side cursors and encoded chunk by chunk, gzip-compressed on the fly
+    when the client accepts it, so any number of rows is sent in constant memory.
+    A plain Django view, as DRF would take ?format= for content negotiation.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': 'Invalid format. Use ndjson or csv.'}, status=400)
+    try:
+        filters = export_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    compress = bool(re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')))
+    response = StreamingHttpResponse(
+        export_stream(filters, export_format, compress), content_type=EXPORT_CONTENT_TYPES[export_format]
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['Content-Disposition'] = f'attachment; filename="bookings.{export_format}"'
+    return response
+
+
+@require_GET
+def booking_qr(request, booking_id):
+    """
+    Serves the QR code of a booking as a PNG rendered from its current details, via the shared
+    cache of encoded images. Requests naming the booking's current version (?v=, as in the qr_code
+    URLs of the API) may be cached by clients for good; others, including outdated versions, are
+    revalidated with the ETag.
+    """
+    try:
+        # Retrieve the booking from the database, or from the archive if it was moved there
+        booking = get_booking(booking_id)
+    except Booking.DoesNotExist:
+        return JsonResponse({'error': 'Booking not found.'}, status=404)
+
+    payload = qr_payload(booking)
+    etag = make_etag('qr', payload)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        with span('booking_qr', 'render'):
+            response = HttpResponse(get_qr_png(payload), content_type='image/png')
+    response['ETag'] = etag
+    # An outdated version would otherwise pin the old image under that URL
+    if request.GET.get('v') == qr_version(booking.updated_at):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@require_GET
+def openapi_schema(request, schema_format):
+    """
+    Serves the OpenAPI schema generated by `manage.py generate_openapi` as static bytes,
+    gzip-compressed when the client accepts it, with an ETag so an unchanged schema gets a 304.
+    """
+    artifact = schema_artifacts()[schema_format]
+    compressed = bool(re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')))
+    # Each encoding is a different representation and needs its own strong ETag
+    etag = f'"{artifact.version}-gzip"' if compressed else f'"{artifact.version}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(artifact.gzipped if compressed else artifact.body, content_type=artifact.content_type)
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, no-cache'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@require_GET
+def swagger_ui(request):
+    """
+    Serves the Swagger UI page. The page loads the schema served by openapi_schema
+    (SWAGGER_SETTINGS['SPEC_URL']) from the browser, so no schema is generated here.
+    """
+    context = {'request': request}
+    SwaggerUIRenderer().set_context(context)
+    context['title'] = API_INFO.title
+    return render(request, SwaggerUIRenderer.template, context)
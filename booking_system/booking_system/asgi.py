@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_system.settings')
 
+# Under ASGI every request may run on a different thread, so persistent connections would pile up
+# (one per thread) instead of being reused; open them per request unless configured explicitly
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
 application = get_asgi_application()
+
+# Pre-fork servers import this module once in the parent; warm it so forked workers share the loaded code
+from django.conf import settings  # noqa: E402
+
+if settings.BOOKING_PRELOAD:
+    from booking.startup import preload
+
+    preload()
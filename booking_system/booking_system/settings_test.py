@@ -0,0 +1,17 @@
+"""
+Settings for running the test suite:
+
+    python manage.py test --settings=booking_system.settings_test
+
+They are the regular settings plus the databases only the tests use.
+"""
+from booking_system.settings import *  # noqa: F401,F403
+from booking_system.settings import BASE_DIR, DATABASES
+
+# A second database standing in for a read replica, for the tests that route reads to it
+# (ReplicaRoutingTests). It is not a mirror: the tests rely on it holding none of the primary's
+# writes. It is not in BOOKING_READ_REPLICAS, so other tests keep reading the primary.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'}}
+else:
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"}}
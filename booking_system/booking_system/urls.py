@@ -1,22 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
-# Define the schema view for API documentation
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Slot Booking API",  # Title of the API
-        default_version='v1',  # API version
-        description="API documentation for the Slot Booking system",  # Brief description of the API
-        contact=openapi.Contact(email="sarahmkhalil95@gmail.com"),  # Contact email for API support
-    ),
-    public=True,  # Allow public access to the schema
-    permission_classes=(permissions.AllowAny,),  # Grant unrestricted access to the documentation
-)
+from booking.views import metrics, openapi_schema, swagger_ui
 
 # Define the main URL patterns
 urlpatterns = [
@@ -24,8 +11,15 @@ urlpatterns = [
     # Include URLs from the 'booking' app under the '/api/' prefix
     path('api/', include('booking.urls')),
 
-    # Swagger UI for API documentation at '/swagger/'
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    # Swagger UI for API documentation at '/swagger/'. Only the UI page is rendered here;
+    # it loads the pre-generated schema from SWAGGER_SETTINGS['SPEC_URL']
+    path('swagger/', swagger_ui, name='schema-swagger-ui'),
+
+    # Pre-generated OpenAPI schema (`manage.py generate_openapi`) at '/openapi.json' and '/openapi.yaml'
+    re_path(r'^openapi\.(?P<schema_format>json|yaml)$', openapi_schema, name='openapi-schema'),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics, name='metrics'),
 
 ]
 
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_system.settings')
 
 application = get_wsgi_application()
+
+# Pre-fork servers import this module once in the parent; warm it so forked workers share the loaded code
+from django.conf import settings  # noqa: E402
+
+if settings.BOOKING_PRELOAD:
+    from booking.startup import preload
+
+    preload()